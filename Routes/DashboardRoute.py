@@ -0,0 +1,191 @@
+import datetime
+import os
+import time
+from collections import OrderedDict
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional, Tuple
+from typing_extensions import TypedDict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_db
+from Routes.UserRoute import UserOut
+
+router = APIRouter()
+
+# Dashboards are read on every app open; a few seconds of staleness is fine
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "5"))
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "10000"))
+
+# Every section is built as JSON by SQLite in one statement, so the endpoint
+# costs a single round trip. Recent submissions are served by the covering
+# ix_submissions_user_recent (migration 4) and completions come from the
+# topic_progress rollup (migration 7).
+DASHBOARD_SQL = """
+WITH profile AS (
+    SELECT json_object(
+        'id', id, 'email', email, 'full_name', full_name,
+        'avatar_url', avatar_url, 'class_', class, 'school', school,
+        'self_description', self_description
+    ) AS body
+    FROM users WHERE id = :user_id
+),
+done AS (
+    SELECT topic_id, completed AS n FROM topic_progress WHERE user_id = :user_id
+),
+totals AS (
+    SELECT topic_id, COUNT(*) AS n FROM lessons GROUP BY topic_id
+),
+progress AS (
+    SELECT json_group_array(json_object(
+        'topic_id', id, 'topic_name', name,
+        'completed', completed, 'total', total
+    )) AS body
+    FROM (
+        SELECT topics.id AS id, topics.name AS name,
+            COALESCE(done.n, 0) AS completed, COALESCE(totals.n, 0) AS total
+        FROM topics
+        LEFT JOIN done ON done.topic_id = topics.id
+        LEFT JOIN totals ON totals.topic_id = topics.id
+        ORDER BY topics.id
+    )
+),
+recent AS (
+    SELECT json_group_array(json_object(
+        'id', id, 'exam_id', exam_id, 'exam_name', exam_name,
+        'grade', grade, 'upload_time', upload_time
+    )) AS body
+    FROM (
+        SELECT submissions.id AS id, submissions.exam_id AS exam_id,
+            exams.name AS exam_name, submissions.grade AS grade,
+            replace(submissions.upload_time, ' ', 'T') AS upload_time
+        FROM submissions JOIN exams ON exams.id = submissions.exam_id
+        WHERE submissions.user_id = :user_id
+        ORDER BY submissions.upload_time DESC, submissions.id DESC
+        LIMIT :submissions
+    )
+),
+upcoming AS (
+    SELECT json_group_array(json_object(
+        'id', id, 'title', title, 'description', description, 'type', type,
+        'event_date', event_date, 'start_time', start_time
+    )) AS body
+    FROM (
+        SELECT id, title, description, type, event_date,
+            strftime('%H:%M:%S', start_time) AS start_time
+        FROM schedule
+        WHERE user_id = :user_id AND event_date >= :today
+        ORDER BY event_date, start_time, id
+        LIMIT :upcoming
+    )
+)
+SELECT profile.body, progress.body, recent.body, upcoming.body
+FROM profile, progress, recent, upcoming
+"""
+
+
+class TopicProgress(TypedDict):
+    topic_id: int
+    topic_name: str
+    completed: int
+    total: int
+
+
+class RecentSubmission(TypedDict):
+    id: int
+    exam_id: int
+    exam_name: str
+    grade: Optional[float]
+    upload_time: Optional[datetime.datetime]
+
+
+class UpcomingEvent(TypedDict):
+    id: int
+    title: str
+    description: Optional[str]
+    type: Optional[str]
+    event_date: datetime.date
+    start_time: Optional[datetime.time]
+
+
+class DashboardOut(TypedDict):
+    profile: UserOut
+    topics: List[TopicProgress]
+    recent_submissions: List[RecentSubmission]
+    upcoming: List[UpcomingEvent]
+
+
+class DashboardCache:
+    """Per-user LRU of rendered dashboards with a short TTL."""
+
+    def __init__(
+        self,
+        ttl: float = DASHBOARD_CACHE_TTL,
+        max_entries: int = DASHBOARD_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    def set(self, key: Tuple, body: bytes):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+dashboard_cache = DashboardCache()
+
+
+@router.get("/users/{user_id}/dashboard", response_model=DashboardOut)
+async def get_dashboard(
+    user_id: int,
+    submissions: int = Query(5, ge=1, le=50),
+    upcoming: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Profile, per-topic lesson completion, latest submissions and upcoming
+    schedule items of one user, in a single query."""
+    key = (user_id, submissions, upcoming)
+    body = dashboard_cache.get(key)
+    if body is None:
+        result = await db.execute(
+            text(DASHBOARD_SQL),
+            {
+                "user_id": user_id,
+                "submissions": submissions,
+                "upcoming": upcoming,
+                "today": datetime.date.today().isoformat(),
+            },
+        )
+        row = result.first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        profile, topics, recent, events = row
+        body = "".join(
+            (
+                '{"profile":',
+                profile,
+                ',"topics":',
+                topics,
+                ',"recent_submissions":',
+                recent,
+                ',"upcoming":',
+                events,
+                "}",
+            )
+        ).encode("utf-8")
+        dashboard_cache.set(key, body)
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,22 @@
+import os
+import secrets
+from fastapi import APIRouter, Header, HTTPException
+from slow_queries import slow_query_log
+
+# Debug endpoints are only served when a token is configured
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+
+router = APIRouter()
+
+
+def check_debug_token(token: str | None):
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not secrets.compare_digest(token, DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+@router.get("/debug/slow-queries", include_in_schema=False)
+def get_slow_queries(x_debug_token: str | None = Header(default=None)):
+    check_debug_token(x_debug_token)
+    return slow_query_log.snapshot()
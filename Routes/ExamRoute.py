@@ -1,9 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
-from typing import List, Optional
-from database import Base, get_db
+from typing import Annotated, List, Optional, Tuple
+from typing_extensions import TypedDict
+from database import Base, get_db, get_read_db
+from exam_import import ImportReport, import_documents, iter_lines, iter_values
+from exam_import import JSON_LINES_TYPES, parse_json
+from exam_stats import PASS_GRADE, exam_stats
+from pagination import Page, PageParams, paginate
+from Routes.QuestionandAnswerRoute import bump_exam_version
 from sqlalchemy import Column, Integer, String, ForeignKey
 
 
@@ -21,6 +28,33 @@ class Exam(Base):
     added_on = Column(String)  # Store as string (DATE) for SQLite compatibility
 
 
+def attempt_deltas(
+    previous: Optional[float], grade: Optional[float]
+) -> Tuple[int, int]:
+    """Change to (student_attempt, correct_attempt) when a submission's grade
+    goes from ``previous`` to ``grade`` (``None`` meaning ungraded)."""
+    attempts = (grade is not None) - (previous is not None)
+    correct = (grade is not None and grade >= PASS_GRADE) - (
+        previous is not None and previous >= PASS_GRADE
+    )
+    return attempts, correct
+
+
+async def add_attempts(db: AsyncSession, exam_id: int, attempts: int, correct: int):
+    """Adjust the attempt counters in place, so concurrent writers never
+    overwrite each other; the caller commits."""
+    if not attempts and not correct:
+        return
+    await db.execute(
+        update(Exam)
+        .where(Exam.id == exam_id)
+        .values(
+            student_attempt=func.coalesce(Exam.student_attempt, 0) + attempts,
+            correct_attempt=func.coalesce(Exam.correct_attempt, 0) + correct,
+        )
+    )
+
+
 # Pydantic schemas
 
 
@@ -30,8 +64,6 @@ class ExamBase(BaseModel):
     province: Optional[str] = None
     topic_id: Optional[int] = None
     rating: Optional[int] = None
-    student_attempt: Optional[int] = 0
-    correct_attempt: Optional[int] = 0
     added_on: Optional[str] = None
 
 
@@ -43,8 +75,12 @@ class ExamUpdate(ExamBase):
     pass
 
 
+# student_attempt and correct_attempt are maintained by the server from
+# graded submissions; create and update requests cannot set them.
 class ExamOut(ExamBase):
     id: int
+    student_attempt: Optional[int] = 0
+    correct_attempt: Optional[int] = 0
 
     class Config:
         orm_mode = True
@@ -58,23 +94,52 @@ router = APIRouter(prefix="/exams", tags=["Exams"])
 async def create_exam(exam: ExamCreate, db: AsyncSession = Depends(get_db)):
     db_exam = Exam(**exam.dict())
     db.add(db_exam)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     await db.refresh(db_exam)
     return db_exam
 
 
+# Import complete exams (questions and answers included)
+@router.post(
+    "/import", response_model=ImportReport, status_code=status.HTTP_201_CREATED
+)
+async def import_exams(request: Request, db: AsyncSession = Depends(get_db)):
+    """Import exam documents (see ``exam_import``), each in its own
+    transaction. A JSON Lines body (``application/x-ndjson``) is imported
+    line by line while it is being received; any other body is parsed as
+    JSON, one exam or an array of them."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in JSON_LINES_TYPES:
+        documents = iter_lines(request.stream())
+    else:
+        try:
+            documents = iter_values(parse_json(await request.body()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON.")
+    report = await import_documents(db, documents)
+    for exam_id in report["exam_ids"]:
+        bump_exam_version(exam_id)
+    if report["errors"] and not report["imported"]:
+        raise HTTPException(status_code=400, detail=report["errors"])
+    return report
+
+
 # Read all Exams
-@router.get("/", response_model=List[ExamOut])
+@router.get("/", response_model=Page[ExamOut])
 async def read_exams(
-    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(select(Exam).offset(skip).limit(limit))
-    return result.scalars().all()
+    exams, next_cursor = await paginate(db, select(Exam), page, [Exam.id])
+    return {"items": exams, "next_cursor": next_cursor}
 
 
 # Read Exam by ID
 @router.get("/{exam_id}", response_model=ExamOut)
-async def read_exam(exam_id: int, db: AsyncSession = Depends(get_db)):
+async def read_exam(exam_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Exam).where(Exam.id == exam_id))
     exam = result.scalar_one_or_none()
     if not exam:
@@ -94,7 +159,11 @@ async def update_exam(
     for key, value in exam.dict(exclude_unset=True).items():
         setattr(db_exam, key, value)
     db.add(db_exam)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     await db.refresh(db_exam)
     return db_exam
 
@@ -107,5 +176,52 @@ async def delete_exam(exam_id: int, db: AsyncSession = Depends(get_db)):
     if not db_exam:
         raise HTTPException(status_code=404, detail="Exam not found")
     await db.delete(db_exam)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # questions and submissions are kept; delete them first
+        await db.rollback()
+        raise HTTPException(
+            status_code=409, detail="Exam still has questions or submissions"
+        )
     return None
+
+
+class AnswerStats(TypedDict):
+    answer_id: int
+    is_correct: bool
+    picks: int
+    pick_rate: float
+
+
+class QuestionStats(TypedDict):
+    question_id: int
+    type: Optional[str]
+    attempts: int
+    correct: int
+    percent_correct: float
+    answers: List[AnswerStats]
+
+
+class ExamStats(TypedDict):
+    exam_id: int
+    student_attempt: int
+    correct_attempt: int
+    questions: List[QuestionStats]
+
+
+# Exam statistics, read from the counters kept up to date on every write
+@router.get("/{exam_id}/stats", response_model=ExamStats)
+async def read_exam_stats(exam_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(
+        select(Exam.student_attempt, Exam.correct_attempt).where(Exam.id == exam_id)
+    )
+    counters = result.first()
+    if counters is None:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    return {
+        "exam_id": exam_id,
+        "student_attempt": counters[0] or 0,
+        "correct_attempt": counters[1] or 0,
+        "questions": await exam_stats(db, exam_id),
+    }
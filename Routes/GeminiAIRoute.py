@@ -1,59 +1,348 @@
 import os
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import httpx
 import logging
 from dotenv import load_dotenv
+from reply_cache import ReplyCache, cache_key
+from retrieval import grounded_prompt, retrieval_index
+from upstream_scheduler import UpstreamScheduler
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-lite:generateContent"
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-lite:generateContent",
+)
+# Streaming variant of the same model; defaults to the :streamGenerateContent
+# sibling of GEMINI_API_URL
+GEMINI_STREAM_URL = os.getenv("GEMINI_STREAM_URL")
+GEMINI_HTTP2 = os.getenv("GEMINI_HTTP2", "1") == "1"
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+# How long a request may wait for a free upstream slot before getting a 503
+GEMINI_SLOT_TIMEOUT = float(os.getenv("GEMINI_SLOT_TIMEOUT", "0.1"))
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+GEMINI_READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", "60"))
+GEMINI_WRITE_TIMEOUT = float(os.getenv("GEMINI_WRITE_TIMEOUT", "10"))
+GEMINI_POOL_TIMEOUT = float(os.getenv("GEMINI_POOL_TIMEOUT", "5"))
 
 router = APIRouter()
 
 logger = logging.getLogger("gemini")
 
 
-class ChatRequest(BaseModel):
-    message: str
+class GeminiClient:
+    """Shared upstream client: one keep-alive pool, bounded in-flight calls.
 
+    Every call is admitted through ``scheduler`` (rate limit, priority
+    queue, retries). Created once in ``main.lifespan`` and closed on shutdown.
+    """
 
-class ChatResponse(BaseModel):
-    reply: str
+    def __init__(
+        self,
+        api_url: str = GEMINI_API_URL,
+        api_key: str | None = GEMINI_API_KEY,
+        stream_url: str | None = GEMINI_STREAM_URL,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        http2: bool = GEMINI_HTTP2,
+        scheduler: UpstreamScheduler | None = None,
+    ):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.stream_url = stream_url or api_url.replace(
+            ":generateContent", ":streamGenerateContent"
+        )
+        self.http = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(
+                connect=GEMINI_CONNECT_TIMEOUT,
+                read=GEMINI_READ_TIMEOUT,
+                write=GEMINI_WRITE_TIMEOUT,
+                pool=GEMINI_POOL_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=30.0,
+            ),
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.scheduler = scheduler or UpstreamScheduler()
 
+    async def aclose(self):
+        await self.scheduler.aclose()
+        await self.http.aclose()
 
-@router.post("/gemini-chat", response_model=ChatResponse)
-async def chat_with_gemini(request: ChatRequest):
-    payload = {"contents": [{"parts": [{"text": request.message}]}]}
-    params = {"key": GEMINI_API_KEY}
-    async with httpx.AsyncClient(timeout=1000.0) as client:
-        response = await client.post(GEMINI_API_URL, json=payload, params=params)
+    async def _acquire_slot(self):
         try:
-            data = response.json()
-        except Exception as e:
-            logger.error(
-                f"Failed to parse Gemini API response as JSON: {e}, raw: {response.text}"
-            )
+            await asyncio.wait_for(self._slots.acquire(), GEMINI_SLOT_TIMEOUT)
+        except asyncio.TimeoutError:
             raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "Failed to parse Gemini API response as JSON.",
-                    "raw": response.text,
-                },
+                status_code=503,
+                detail="AI tutor is busy, please retry shortly.",
+                headers={"Retry-After": "1"},
             )
-        logger.info(f"Gemini API response: {data}")
-        if response.status_code != 200:
-            logger.error(f"Gemini API error: {response.status_code} {data}")
-            raise HTTPException(status_code=response.status_code, detail=data)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self._acquire_slot()
         try:
-            reply = data["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception as e:
-            logger.error(f"Unexpected Gemini API response structure: {data}")
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "Unexpected Gemini API response structure.",
-                    "raw": data,
-                },
+            yield
+        finally:
+            self._slots.release()
+
+    async def _post(self, message: str) -> httpx.Response:
+        payload = {"contents": [{"parts": [{"text": message}]}]}
+        params = {"key": self.api_key}
+        async with self.slot():
+            try:
+                return await self.http.post(self.api_url, json=payload, params=params)
+            except httpx.TimeoutException as e:
+                logger.error(f"Gemini API timeout: {e!r}")
+                raise HTTPException(status_code=504, detail="Gemini API timed out.")
+            except httpx.TransportError as e:
+                logger.error(f"Gemini API transport error: {e!r}")
+                raise HTTPException(status_code=502, detail="Gemini API unreachable.")
+
+    async def _send_stream(self, message: str) -> "UpstreamStream":
+        payload = {"contents": [{"parts": [{"text": message}]}]}
+        params = {"key": self.api_key, "alt": "sse"}
+        await self._acquire_slot()
+        try:
+            request = self.http.build_request(
+                "POST", self.stream_url, json=payload, params=params
             )
-        return ChatResponse(reply=reply)
+            response = await self.http.send(request, stream=True)
+        except httpx.TimeoutException as e:
+            self._slots.release()
+            logger.error(f"Gemini API timeout: {e!r}")
+            raise HTTPException(status_code=504, detail="Gemini API timed out.")
+        except httpx.TransportError as e:
+            self._slots.release()
+            logger.error(f"Gemini API transport error: {e!r}")
+            raise HTTPException(status_code=502, detail="Gemini API unreachable.")
+        return UpstreamStream(response, self._slots.release)
+
+    async def generate(
+        self, message: str, priority: str = "interactive"
+    ) -> httpx.Response:
+        return await self.scheduler.send(lambda: self._post(message), priority)
+
+    async def open_stream(
+        self, message: str, priority: str = "interactive"
+    ) -> "UpstreamStream":
+        """Start a streaming generation and check its status.
+
+        Errors surface here, before the client response starts. The returned
+        stream holds an upstream slot until it is closed.
+        """
+        stream = await self.scheduler.send(lambda: self._send_stream(message), priority)
+        if stream.status_code != 200:
+            body = await stream.response.aread()
+            await stream.aclose()
+            try:
+                detail = json.loads(body)
+            except ValueError:
+                detail = {"raw": body.decode("utf-8", "replace")}
+            logger.error(f"Gemini API error: {stream.status_code} {detail}")
+            raise upstream_error(stream.response, detail)
+        return stream
+
+
+class UpstreamStream:
+    """An open streaming response from Gemini; ``aclose`` is idempotent."""
+
+    def __init__(self, response: httpx.Response, release):
+        self.response = response
+        self._release = release
+        self.closed = False
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def headers(self) -> httpx.Headers:
+        return self.response.headers
+
+    async def aclose(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.response.aclose()
+        finally:
+            self._release()
+
+    async def iter_text(self) -> AsyncIterator[str]:
+        """Yield text fragments as the upstream SSE events arrive."""
+        try:
+            async for line in self.response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:") :])
+                for candidate in data.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+        finally:
+            await self.aclose()
+
+
+def upstream_error(response: httpx.Response, detail) -> HTTPException:
+    # Quota exhaustion that outlived our retries is our problem, not the
+    # client's: report it as "busy" and pass on the upstream's Retry-After.
+    if response.status_code == 429:
+        return HTTPException(
+            status_code=503,
+            detail="AI tutor is busy, please retry shortly.",
+            headers={"Retry-After": response.headers.get("Retry-After", "1")},
+        )
+    return HTTPException(status_code=response.status_code, detail=detail)
+
+
+def get_gemini(request: Request) -> GeminiClient:
+    return request.app.state.gemini
+
+
+def get_reply_cache(request: Request) -> ReplyCache:
+    return request.app.state.gemini_cache
+
+
+def model_name(api_url: str) -> str:
+    # .../models/gemini-2.0-flash-lite:generateContent -> gemini-2.0-flash-lite
+    return api_url.rsplit("/", 1)[-1].split(":", 1)[0]
+
+
+class ChatRequest(BaseModel):
+    message: str
+    # bulk callers (e.g. batch generation jobs) queue behind interactive chats
+    priority: Literal["interactive", "bulk"] = "interactive"
+    # attach the most relevant lesson/flashcard passages to the prompt
+    grounded: bool = True
+
+    def prompt(self) -> str:
+        if not self.grounded:
+            return self.message
+        return grounded_prompt(self.message, retrieval_index.context(self.message))
+
+
+class ChatResponse(BaseModel):
+    reply: str
+
+
+async def fetch_reply(
+    gemini: GeminiClient, message: str, priority: str = "interactive"
+) -> str:
+    response = await gemini.generate(message, priority)
+    try:
+        data = response.json()
+    except Exception as e:
+        logger.error(
+            f"Failed to parse Gemini API response as JSON: {e}, raw: {response.text}"
+        )
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "Failed to parse Gemini API response as JSON.",
+                "raw": response.text,
+            },
+        )
+    logger.info(f"Gemini API response: {data}")
+    if response.status_code != 200:
+        logger.error(f"Gemini API error: {response.status_code} {data}")
+        raise upstream_error(response, data)
+    try:
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+    except Exception as e:
+        logger.error(f"Unexpected Gemini API response structure: {data}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "Unexpected Gemini API response structure.",
+                "raw": data,
+            },
+        )
+
+
+@router.post("/gemini-chat", response_model=ChatResponse)
+async def chat_with_gemini(
+    request: ChatRequest,
+    gemini: GeminiClient = Depends(get_gemini),
+    cache: ReplyCache = Depends(get_reply_cache),
+):
+    prompt = request.prompt()
+    key = cache_key(model_name(gemini.api_url), prompt)
+    reply = await cache.get_or_fetch(
+        key, lambda: fetch_reply(gemini, prompt, request.priority)
+    )
+    return ChatResponse(reply=reply)
+
+
+@router.get("/gemini-chat/cache-stats")
+async def gemini_cache_stats(cache: ReplyCache = Depends(get_reply_cache)):
+    return cache.stats()
+
+
+@router.get("/gemini-chat/queue-stats")
+async def gemini_queue_stats(gemini: GeminiClient = Depends(get_gemini)):
+    return gemini.scheduler.stats()
+
+
+def _sse(data: dict, event: str | None = None) -> bytes:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def _sse_cached(reply: str):
+    yield _sse({"text": reply})
+    yield _sse({"cached": True}, event="done")
+
+
+async def _sse_upstream(stream: UpstreamStream, cache: ReplyCache, key: str):
+    parts = []
+    try:
+        async for text in stream.iter_text():
+            parts.append(text)
+            yield _sse({"text": text})
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"Gemini stream interrupted: {e!r}")
+        yield _sse({"error": "Gemini stream interrupted."}, event="error")
+        return
+    finally:
+        await stream.aclose()
+    reply = "".join(parts)
+    if reply:
+        cache.store(key, reply)
+    yield _sse({"cached": False}, event="done")
+
+
+@router.post("/gemini-chat/stream")
+async def stream_chat_with_gemini(
+    request: ChatRequest,
+    gemini: GeminiClient = Depends(get_gemini),
+    cache: ReplyCache = Depends(get_reply_cache),
+):
+    """Server-Sent Events: ``data: {"text": ...}`` per fragment, then ``done``."""
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    prompt = request.prompt()
+    key = cache_key(model_name(gemini.api_url), prompt)
+    cached = cache.peek(key)
+    if cached is not None:
+        return StreamingResponse(
+            _sse_cached(cached), media_type="text/event-stream", headers=headers
+        )
+    stream = await gemini.open_stream(prompt, request.priority)
+    return StreamingResponse(
+        _sse_upstream(stream, cache, key),
+        media_type="text/event-stream",
+        headers=headers,
+        # releases the upstream slot even if the body was never iterated
+        background=BackgroundTask(stream.aclose),
+    )
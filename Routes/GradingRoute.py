@@ -0,0 +1,228 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, select, update, func, case, distinct, bindparam
+from database import get_db, SessionLocal
+from leaderboard import leaderboards, sync_best_grades
+from Routes.ExamRoute import Exam, add_attempts, attempt_deltas
+from Routes.QuestionandAnswerRoute import Question, Answer, exam_version
+from Routes.SubmissionRecordRoute import SubmissionRecord
+from Routes.SubmissionRoute import Submission, SubmissionOut
+import logging
+
+router = APIRouter()
+
+logger = logging.getLogger("grading")
+
+# Grades use the same 0-10 scale as the seeded submissions.
+MAX_GRADE = 10.0
+
+# exam_id -> (exam version, {question_id: (question_type, number_of_correct_answers)})
+_answer_keys: Dict[int, Tuple[Tuple[int, int], Dict[int, Tuple[str, int]]]] = {}
+
+
+class GradeResult(BaseModel):
+    exam_id: int
+    graded: int
+    student_attempt_delta: int
+    correct_attempt_delta: int
+
+
+class GradeJobAccepted(BaseModel):
+    exam_id: int
+    status: str
+
+
+def answer_key_query(exam_id: int) -> Select:
+    """(question_id, type, number of correct answers) for each question."""
+    return (
+        select(
+            Question.id,
+            Question.type,
+            func.count(case((Answer.is_correct.is_(True), 1))),
+        )
+        .outerjoin(Answer, Answer.question_id == Question.id)
+        .where(Question.exam_id == exam_id)
+        .group_by(Question.id, Question.type)
+    )
+
+
+def grading_query(
+    exam_id: int, submission_ids: Optional[List[int]] = None, regrade: bool = False
+) -> Select:
+    """Picks and correct picks per submission and question."""
+    stmt = (
+        select(
+            Submission.id,
+            Submission.user_id,
+            Submission.grade,
+            SubmissionRecord.question_id,
+            func.count(distinct(Answer.id)),
+            func.count(distinct(case((Answer.is_correct.is_(True), Answer.id)))),
+        )
+        .outerjoin(SubmissionRecord, SubmissionRecord.submission_id == Submission.id)
+        .outerjoin(
+            Question,
+            (Question.id == SubmissionRecord.question_id)
+            & (Question.exam_id == Submission.exam_id),
+        )
+        .outerjoin(
+            Answer,
+            (Answer.id == SubmissionRecord.chosen_answer_id)
+            & (Answer.question_id == Question.id),
+        )
+        .where(Submission.exam_id == exam_id)
+        .group_by(
+            Submission.id,
+            Submission.user_id,
+            Submission.grade,
+            SubmissionRecord.question_id,
+        )
+    )
+    if submission_ids is not None:
+        stmt = stmt.where(Submission.id.in_(submission_ids))
+    elif not regrade:
+        stmt = stmt.where(Submission.grade.is_(None))
+    return stmt
+
+
+async def get_answer_key(db: AsyncSession, exam_id: int) -> Dict[int, Tuple[str, int]]:
+    version = exam_version(exam_id)
+    cached = _answer_keys.get(exam_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    result = await db.execute(answer_key_query(exam_id))
+    key = {qid: (qtype, n_correct) for qid, qtype, n_correct in result.all()}
+    # like the exam payload cache, an empty key is not kept: the exam may be
+    # imported later by another process
+    if key:
+        _answer_keys[exam_id] = (version, key)
+    return key
+
+
+def _is_question_correct(qtype: str, n_correct: int, picks: int, hits: int) -> bool:
+    if picks == 0 or picks != hits:
+        # unanswered, or at least one wrong answer chosen
+        return False
+    if qtype == "single":
+        return picks == 1
+    # 'multiple': every correct answer and nothing else
+    return hits == n_correct
+
+
+async def grade_submissions(
+    db: AsyncSession,
+    exam_id: int,
+    submission_ids: Optional[List[int]] = None,
+    regrade: bool = False,
+) -> GradeResult:
+    """Grade submissions of one exam in a single set-based pass.
+
+    With ``submission_ids`` only those submissions are graded, otherwise the
+    exam's backlog (submissions without a grade, or all of them when
+    ``regrade`` is set). Grades and the exam attempt counters are written in
+    one transaction.
+    """
+    key = await get_answer_key(db, exam_id)
+    total_questions = len(key)
+
+    previous: Dict[int, Optional[float]] = {}
+    correct_counts: Dict[int, int] = {}
+    user_ids = set()
+    result = await db.execute(grading_query(exam_id, submission_ids, regrade))
+    for sub_id, user_id, prev_grade, question_id, picks, hits in result.all():
+        previous[sub_id] = prev_grade
+        user_ids.add(user_id)
+        correct_counts.setdefault(sub_id, 0)
+        answer = key.get(question_id)
+        if answer is not None and _is_question_correct(
+            answer[0], answer[1], picks, hits
+        ):
+            correct_counts[sub_id] += 1
+
+    if not previous:
+        return GradeResult(
+            exam_id=exam_id, graded=0, student_attempt_delta=0, correct_attempt_delta=0
+        )
+
+    grades = []
+    attempt_delta = 0
+    correct_delta = 0
+    for sub_id, n_correct in correct_counts.items():
+        grade = (
+            round(MAX_GRADE * n_correct / total_questions, 2)
+            if total_questions
+            else 0.0
+        )
+        grades.append({"sub_id": sub_id, "new_grade": grade})
+        attempts, correct = attempt_deltas(previous[sub_id], grade)
+        attempt_delta += attempts
+        correct_delta += correct
+
+    await db.execute(
+        update(Submission.__table__)
+        .where(Submission.__table__.c.id == bindparam("sub_id"))
+        .values(grade=bindparam("new_grade")),
+        grades,
+    )
+    await add_attempts(db, exam_id, attempt_delta, correct_delta)
+    # a whole-exam pass touches most of its students: recompute them all
+    updates = await sync_best_grades(
+        db, exam_id, user_ids if submission_ids is not None else None
+    )
+    await db.commit()
+    leaderboards.apply(updates)
+    return GradeResult(
+        exam_id=exam_id,
+        graded=len(grades),
+        student_attempt_delta=attempt_delta,
+        correct_attempt_delta=correct_delta,
+    )
+
+
+async def grade_exam_backlog_task(exam_id: int, regrade: bool = False):
+    async with SessionLocal() as session:
+        try:
+            result = await grade_submissions(session, exam_id, regrade=regrade)
+            logger.info(f"Graded exam {exam_id} backlog: {result}")
+        except Exception as e:
+            logger.error(f"Background grading of exam {exam_id} failed: {e}")
+
+
+@router.post("/submissions/{submission_id}/grade", response_model=SubmissionOut)
+async def grade_submission(submission_id: int, db: AsyncSession = Depends(get_db)):
+    sub = await db.get(Submission, submission_id)
+    if not sub:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    await grade_submissions(db, sub.exam_id, submission_ids=[submission_id])
+    await db.refresh(sub)
+    return sub
+
+
+@router.post("/exams/{exam_id}/grade", response_model=GradeResult)
+async def grade_exam(
+    exam_id: int, regrade: bool = False, db: AsyncSession = Depends(get_db)
+):
+    exam = await db.get(Exam, exam_id)
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    return await grade_submissions(db, exam_id, regrade=regrade)
+
+
+@router.post(
+    "/exams/{exam_id}/grade/background",
+    response_model=GradeJobAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def grade_exam_in_background(
+    exam_id: int,
+    background_tasks: BackgroundTasks,
+    regrade: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    exam = await db.get(Exam, exam_id)
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    background_tasks.add_task(grade_exam_backlog_task, exam_id, regrade)
+    return GradeJobAccepted(exam_id=exam_id, status="queued")
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional
+from typing_extensions import TypedDict
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_read_db
+from leaderboard import Board, leaderboards
+from pagination import MAX_PAGE_SIZE
+from Routes.UserRoute import UserORM
+
+router = APIRouter()
+
+
+class LeaderboardEntry(TypedDict):
+    rank: int
+    user_id: int
+    full_name: Optional[str]
+    school: Optional[str]
+    score: float
+
+
+class Leaderboard(TypedDict):
+    total: int
+    items: List[LeaderboardEntry]
+
+
+class RankOut(TypedDict):
+    rank: int
+    score: float
+    total: int
+
+
+class ExamRankOut(RankOut):
+    exam_id: int
+
+
+class UserRanks(TypedDict):
+    user_id: int
+    global_rank: Optional[RankOut]
+    school_rank: Optional[RankOut]
+    exams: List[ExamRankOut]
+
+
+async def _render(db: AsyncSession, board: Optional[Board], limit: int, offset: int):
+    if board is None:
+        return {"total": 0, "items": []}
+    top = board.top(limit, offset)
+    result = await db.execute(
+        select(UserORM.id, UserORM.full_name, UserORM.school).where(
+            UserORM.id.in_([user_id for _, user_id, _ in top])
+        )
+    )
+    users = {user_id: (full_name, school) for user_id, full_name, school in result}
+    items = []
+    for rank, user_id, score in top:
+        full_name, school = users.get(user_id, (None, None))
+        items.append(
+            {
+                "rank": rank,
+                "user_id": user_id,
+                "full_name": full_name,
+                "school": school,
+                "score": score,
+            }
+        )
+    return {"total": len(board), "items": items}
+
+
+@router.get("/leaderboards/global", response_model=Leaderboard)
+async def global_leaderboard(
+    limit: int = Query(10, gt=0, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Students by the sum of their best grade on every exam."""
+    return await _render(db, leaderboards.global_board, limit, offset)
+
+
+@router.get("/leaderboards/schools/{school}", response_model=Leaderboard)
+async def school_leaderboard(
+    school: str,
+    limit: int = Query(10, gt=0, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await _render(db, leaderboards.schools.get(school), limit, offset)
+
+
+@router.get("/leaderboards/exams/{exam_id}", response_model=Leaderboard)
+async def exam_leaderboard(
+    exam_id: int,
+    limit: int = Query(10, gt=0, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Students by their best grade on one exam."""
+    return await _render(db, leaderboards.exams.get(exam_id), limit, offset)
+
+
+@router.get("/leaderboards/users/{user_id}", response_model=UserRanks)
+async def user_ranks(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    user = await db.get(UserORM, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    school_board = leaderboards.schools.get(user.school) if user.school else None
+    exams = [
+        {"exam_id": exam_id, **rank._asdict()}
+        for exam_id, rank in leaderboards.exam_ranks(user_id)
+    ]
+    global_rank = leaderboards.global_board.rank(user_id)
+    school_rank = school_board.rank(user_id) if school_board is not None else None
+    return {
+        "user_id": user_id,
+        "global_rank": global_rank._asdict() if global_rank else None,
+        "school_rank": school_rank._asdict() if school_rank else None,
+        "exams": exams,
+    }
+
+
+@router.post("/leaderboards/rebuild")
+async def rebuild_leaderboards(db: AsyncSession = Depends(get_db)):
+    """Recompute every leaderboard from ``submissions``."""
+    await leaderboards.rebuild(db)
+    return {
+        "message": "Leaderboards rebuilt.",
+        "students": len(leaderboards.global_board),
+    }
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import List
-from sqlalchemy import select
+from typing import Annotated, List, Optional
+from typing_extensions import TypedDict
+from sqlalchemy import select, text
 from sqlalchemy.exc import IntegrityError
-from database import get_db, Base
+from database import get_db, get_read_db, Base
+from pagination import Page, PageParams, paginate_rows
+from retrieval import retrieval_index
+from Routes.LessonCompletedRoute import (
+    delete_legacy_progress,
+    move_lesson_progress,
+    remove_lesson_progress,
+)
+from serialization import RowSerializer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import Column, Integer, String, Text, ForeignKey
 
@@ -29,20 +38,35 @@ class Lesson(BaseModel):
     short_describe: str | None = None
 
 
-@router.get("/lessons")
-async def get_lessons(db: AsyncSession = Depends(get_db)):
-    stmt = select(LessonORM).order_by(LessonORM.topic_id)
-    result = await db.execute(stmt)
-    lessons = result.scalars().all()
-    return [lesson.__dict__ for lesson in lessons]
+class LessonOut(TypedDict):
+    id: int
+    topic_id: int
+    title: str
+    content: Optional[str]
+    video_url: Optional[str]
+    short_describe: Optional[str]
 
 
-@router.get("/lessons/{lesson_id}")
-async def get_lesson(lesson_id: int, db: AsyncSession = Depends(get_db)):
-    lesson = await db.get(LessonORM, lesson_id)
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-    return lesson.__dict__
+lesson_rows = RowSerializer(LessonORM, LessonOut)
+
+# keyset order of GET /lessons
+LESSON_PAGE_KEYS = [LessonORM.topic_id, LessonORM.id]
+
+
+@router.get("/lessons", response_model=Page[LessonOut])
+async def get_lessons(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    rows, next_cursor = await paginate_rows(
+        db, lesson_rows.select(), page, LESSON_PAGE_KEYS
+    )
+    return lesson_rows.page(rows, next_cursor)
+
+
+@router.get("/lessons/{lesson_id}", response_model=LessonOut)
+async def get_lesson(lesson_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(lesson_rows.select().where(LessonORM.id == lesson_id))
+    return lesson_rows.one(result.first(), "Lesson not found")
 
 
 @router.post("/lessons", status_code=201)
@@ -52,6 +76,7 @@ async def create_lesson(lesson: Lesson, db: AsyncSession = Depends(get_db)):
     try:
         await db.commit()
         await db.refresh(lesson_obj)
+        retrieval_index.index_lesson(lesson_obj)
         return lesson_obj.__dict__
     except IntegrityError as e:
         await db.rollback()
@@ -62,15 +87,15 @@ async def create_lesson(lesson: Lesson, db: AsyncSession = Depends(get_db)):
 async def create_lessons_bulk(lessons: List[Lesson], db: AsyncSession = Depends(get_db)):
     created_lessons = []
     try:
-        for lesson in lessons:
-            lesson_obj = LessonORM(**lesson.dict())
-            db.add(lesson_obj)
+        lesson_objs = [LessonORM(**lesson.dict()) for lesson in lessons]
+        db.add_all(lesson_objs)
         
         await db.commit()
         
         # Refresh all objects to get their IDs
-        for lesson_obj in db.new:
+        for lesson_obj in lesson_objs:
             await db.refresh(lesson_obj)
+            retrieval_index.index_lesson(lesson_obj)
             created_lessons.append(lesson_obj.__dict__)
         
         return {
@@ -92,11 +117,15 @@ async def update_lesson(
     lesson_obj = await db.get(LessonORM, lesson_id)
     if not lesson_obj:
         raise HTTPException(status_code=404, detail="Lesson not found")
+    old_topic_id = lesson_obj.topic_id
     for key, value in lesson.dict().items():
         setattr(lesson_obj, key, value)
     try:
+        if lesson.topic_id != old_topic_id:
+            await move_lesson_progress(db, lesson_id, old_topic_id, lesson.topic_id)
         await db.commit()
         await db.refresh(lesson_obj)
+        retrieval_index.index_lesson(lesson_obj)
         return lesson_obj.__dict__
     except IntegrityError as e:
         await db.rollback()
@@ -108,6 +137,21 @@ async def delete_lesson(lesson_id: int, db: AsyncSession = Depends(get_db)):
     lesson_obj = await db.get(LessonORM, lesson_id)
     if not lesson_obj:
         raise HTTPException(status_code=404, detail="Lesson not found")
+    # completions and flashcards of the lesson go with it
+    await remove_lesson_progress(db, lesson_id, lesson_obj.topic_id)
+    result = await db.execute(
+        text("DELETE FROM quizlet WHERE lesson_id = :lesson_id RETURNING id"),
+        {"lesson_id": lesson_id},
+    )
+    quizlet_ids = result.scalars().all()
+    await delete_legacy_progress(db, "lesson_id", lesson_id)
     await db.delete(lesson_obj)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    retrieval_index.remove_lesson(lesson_id)
+    for quizlet_id in quizlet_ids:
+        retrieval_index.remove_quizlet(quizlet_id)
     return
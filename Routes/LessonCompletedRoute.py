@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import Select, select, text
 from sqlalchemy.exc import IntegrityError
-from database import get_db, Base
+from database import get_db, get_read_db, Base
+from pagination import Page, PageParams, paginate_rows
+from serialization import RowSerializer
+from typing import Annotated, List, Optional
+from typing_extensions import TypedDict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
 import datetime
 
 
@@ -15,9 +19,88 @@ class LessonCompletedORM(Base):
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
     completed_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("ux_lessons_completed_user_lesson", "user_id", "lesson_id", unique=True),
+    )
+
 
 router = APIRouter()
 
+# topic_progress (migration 7) counts each user's completed lessons per topic.
+# It is adjusted in place by every write to lessons_completed, in the same
+# transaction, so progress reads never count lessons_completed rows.
+_ADJUST_PROGRESS = text(
+    "INSERT INTO topic_progress (user_id, topic_id, completed) "
+    "SELECT :user_id, topic_id, :delta FROM lessons WHERE id = :lesson_id "
+    "ON CONFLICT (user_id, topic_id) DO UPDATE SET completed = completed + :delta"
+)
+
+PROGRESS_SQL = text("""
+    SELECT topics.id, topics.name, COALESCE(topic_progress.completed, 0),
+        (SELECT COUNT(*) FROM lessons WHERE lessons.topic_id = topics.id)
+    FROM topics
+    LEFT JOIN topic_progress ON topic_progress.user_id = :user_id
+        AND topic_progress.topic_id = topics.id
+    ORDER BY topics.id
+    """)
+
+
+async def adjust_progress(db: AsyncSession, user_id: int, lesson_id: int, delta: int):
+    await db.execute(
+        _ADJUST_PROGRESS, {"user_id": user_id, "lesson_id": lesson_id, "delta": delta}
+    )
+
+
+async def move_lesson_progress(
+    db: AsyncSession, lesson_id: int, old_topic_id: int, new_topic_id: int
+):
+    """Carry completions of a lesson over when it moves to another topic."""
+    params = {"lesson_id": lesson_id, "old": old_topic_id, "new": new_topic_id}
+    await db.execute(
+        text(
+            "UPDATE topic_progress SET completed = completed - 1 "
+            "WHERE topic_id = :old AND user_id IN "
+            "(SELECT user_id FROM lessons_completed WHERE lesson_id = :lesson_id)"
+        ),
+        params,
+    )
+    await db.execute(
+        text(
+            "INSERT INTO topic_progress (user_id, topic_id, completed) "
+            "SELECT user_id, :new, 1 FROM lessons_completed WHERE lesson_id = :lesson_id "
+            "ON CONFLICT (user_id, topic_id) DO UPDATE SET completed = completed + 1"
+        ),
+        params,
+    )
+
+
+async def remove_lesson_progress(db: AsyncSession, lesson_id: int, topic_id: int):
+    """Delete the completions of a lesson that is being deleted."""
+    params = {"lesson_id": lesson_id, "topic_id": topic_id}
+    await db.execute(
+        text(
+            "UPDATE topic_progress SET completed = completed - 1 "
+            "WHERE topic_id = :topic_id AND user_id IN "
+            "(SELECT user_id FROM lessons_completed WHERE lesson_id = :lesson_id)"
+        ),
+        params,
+    )
+    await db.execute(
+        text("DELETE FROM lessons_completed WHERE lesson_id = :lesson_id"), params
+    )
+
+
+async def delete_legacy_progress(db: AsyncSession, column: str, value: int):
+    """Delete rows of the seed script's ``progress`` table, which no route
+    uses but whose foreign keys still block deleting users and lessons."""
+    result = await db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'progress'")
+    )
+    if result.first() is not None:
+        await db.execute(
+            text(f"DELETE FROM progress WHERE {column} = :value"), {"value": value}
+        )
+
 
 class LessonCompleted(BaseModel):
     user_id: int
@@ -25,19 +108,42 @@ class LessonCompleted(BaseModel):
     completed_at: datetime.datetime | None = None
 
 
-@router.get("/lessons-completed")
-async def get_lessons_completed(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(LessonCompletedORM))
-    items = result.scalars().all()
-    return [item.__dict__ for item in items]
+class LessonCompletedOut(TypedDict):
+    id: int
+    user_id: int
+    lesson_id: int
+    completed_at: Optional[datetime.datetime]
 
 
-@router.get("/lessons-completed/{item_id}")
-async def get_lesson_completed(item_id: int, db: AsyncSession = Depends(get_db)):
-    item = await db.get(LessonCompletedORM, item_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Lesson completed record not found")
-    return item.__dict__
+class TopicProgressOut(TypedDict):
+    topic_id: int
+    topic_name: str
+    completed: int
+    total: int
+    ratio: float
+
+
+lesson_completed_rows = RowSerializer(LessonCompletedORM, LessonCompletedOut)
+
+
+@router.get("/lessons-completed", response_model=Page[LessonCompletedOut])
+async def get_lessons_completed(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    rows, next_cursor = await paginate_rows(
+        db, lesson_completed_rows.select(), page, [LessonCompletedORM.id]
+    )
+    return lesson_completed_rows.page(rows, next_cursor)
+
+
+@router.get("/lessons-completed/{item_id}", response_model=LessonCompletedOut)
+async def get_lesson_completed(item_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(
+        lesson_completed_rows.select().where(LessonCompletedORM.id == item_id)
+    )
+    return lesson_completed_rows.one(
+        result.first(), "Lesson completed record not found"
+    )
 
 
 @router.post("/lessons-completed", status_code=201)
@@ -47,6 +153,9 @@ async def create_lesson_completed(
     item_obj = LessonCompletedORM(**data.dict())
     db.add(item_obj)
     try:
+        # the unique (user_id, lesson_id) index rejects a repeat completion here
+        await db.flush()
+        await adjust_progress(db, data.user_id, data.lesson_id, 1)
         await db.commit()
         await db.refresh(item_obj)
         return item_obj.__dict__
@@ -62,9 +171,14 @@ async def update_lesson_completed(
     item_obj = await db.get(LessonCompletedORM, item_id)
     if not item_obj:
         raise HTTPException(status_code=404, detail="Lesson completed record not found")
+    old_user_id, old_lesson_id = item_obj.user_id, item_obj.lesson_id
     for key, value in data.dict().items():
         setattr(item_obj, key, value)
     try:
+        await db.flush()
+        if (old_user_id, old_lesson_id) != (data.user_id, data.lesson_id):
+            await adjust_progress(db, old_user_id, old_lesson_id, -1)
+            await adjust_progress(db, data.user_id, data.lesson_id, 1)
         await db.commit()
         await db.refresh(item_obj)
         return item_obj.__dict__
@@ -79,16 +193,36 @@ async def delete_lesson_completed(item_id: int, db: AsyncSession = Depends(get_d
     if not item_obj:
         raise HTTPException(status_code=404, detail="Lesson completed record not found")
     await db.delete(item_obj)
+    await adjust_progress(db, item_obj.user_id, item_obj.lesson_id, -1)
     await db.commit()
     return
 
 
-@router.get("/lessons-completed/by-user/{user_id}")
+def user_completions_query(user_id: int) -> Select:
+    return lesson_completed_rows.select().where(LessonCompletedORM.user_id == user_id)
+
+
+@router.get(
+    "/lessons-completed/by-user/{user_id}", response_model=List[LessonCompletedOut]
+)
 async def get_lessons_completed_by_user(
-    user_id: int, db: AsyncSession = Depends(get_db)
+    user_id: int, db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(
-        select(LessonCompletedORM).where(LessonCompletedORM.user_id == user_id)
-    )
-    items = result.scalars().all()
-    return [item.__dict__ for item in items]
+    result = await db.execute(user_completions_query(user_id))
+    return lesson_completed_rows.many(result.all())
+
+
+@router.get("/users/{user_id}/progress", response_model=List[TopicProgressOut])
+async def get_user_progress(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Completion ratio of every topic for one user."""
+    result = await db.execute(PROGRESS_SQL, {"user_id": user_id})
+    return [
+        {
+            "topic_id": topic_id,
+            "topic_name": name,
+            "completed": completed,
+            "total": total,
+            "ratio": round(completed / total, 4) if total else 0.0,
+        }
+        for topic_id, name, completed, total in result.all()
+    ]
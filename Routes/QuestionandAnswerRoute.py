@@ -1,7 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from database import get_db
+from sqlalchemy import Select, select
+from database import get_read_db
+from pagination import Page, PageParams, paginate
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Dict, List, Optional, Tuple
+from typing_extensions import TypedDict
+import asyncio
+import json
+import os
 
 router = APIRouter()
 
@@ -28,16 +36,36 @@ class Answer(Base):
     is_correct = Column(Boolean)
 
 
-@router.get("/questions-with-answers", response_model=list[dict])
-async def get_questions_with_answers(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Question))
-    questions = result.scalars().all()
+class AnswerOut(TypedDict):
+    id: int
+    content: Optional[str]
+    is_correct: Optional[bool]
+
+
+class QuestionWithAnswersOut(TypedDict):
+    id: int
+    content: Optional[str]
+    type: Optional[str]
+    answers: List[AnswerOut]
+
+
+def exam_questions_query(exam_id: int) -> Select:
+    return select(Question).where(Question.exam_id == exam_id)
+
+
+def question_answers_query(question_ids: List[int]) -> Select:
+    return select(Answer).where(Answer.question_id.in_(question_ids))
+
+
+@router.get("/questions-with-answers", response_model=Page[QuestionWithAnswersOut])
+async def get_questions_with_answers(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    questions, next_cursor = await paginate(db, select(Question), page, [Question.id])
     if not questions:
-        return []
+        return {"items": [], "next_cursor": None}
     question_ids = [q.id for q in questions]
-    result = await db.execute(
-        select(Answer).where(Answer.question_id.in_(question_ids))
-    )
+    result = await db.execute(question_answers_query(question_ids))
     answers = result.scalars().all()
     from collections import defaultdict
 
@@ -55,21 +83,113 @@ async def get_questions_with_answers(db: AsyncSession = Depends(get_db)):
             "answers": answer_map.get(q.id, []),
         }
         response.append(q_dict)
-    return response
+    return {"items": response, "next_cursor": next_cursor}
 
 
-@router.get("/questions-with-answers/exam/{exam_id}", response_model=list[dict])
-async def get_questions_with_answers_by_exam_id(
-    exam_id: int, db: AsyncSession = Depends(get_db)
-):
-    result = await db.execute(select(Question).where(Question.exam_id == exam_id))
+# Exam payload cache: exam_id -> serialized JSON of
+# /questions-with-answers/exam/{exam_id}, tagged with the exam's version.
+EXAM_CACHE_MAX_ENTRIES = int(os.getenv("EXAM_CACHE_MAX_ENTRIES", "256"))
+EXAM_CACHE_MAX_BYTES = int(os.getenv("EXAM_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_global_version = 0
+_exam_versions: Dict[int, int] = {}
+
+
+def exam_version(exam_id: int) -> Tuple[int, int]:
+    return (_global_version, _exam_versions.get(exam_id, 0))
+
+
+def bump_exam_version(exam_id: Optional[int] = None):
+    """Invalidate cached data for an exam whose questions or answers changed.
+
+    Without ``exam_id`` every exam is invalidated (e.g. after a DB reset).
+    """
+    global _global_version
+    if exam_id is None:
+        _global_version += 1
+        _exam_versions.clear()
+    else:
+        _exam_versions[exam_id] = _exam_versions.get(exam_id, 0) + 1
+
+
+class ExamPayloadCache:
+    """LRU cache of serialized exam payloads, capped by entries and bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[int, Tuple[Tuple[int, int], bytes]]" = OrderedDict()
+        # exam_id -> [lock, holders and waiters]; only exams being built
+        self._locks: Dict[int, List] = {}
+
+    def get(self, exam_id: int) -> Optional[bytes]:
+        entry = self._entries.get(exam_id)
+        if entry is None:
+            return None
+        version, body = entry
+        if version != exam_version(exam_id):
+            self._remove(exam_id)
+            return None
+        self._entries.move_to_end(exam_id)
+        return body
+
+    def put(self, exam_id: int, version: Tuple[int, int], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        self._remove(exam_id)
+        self._entries[exam_id] = (version, body)
+        self.size += len(body)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    @asynccontextmanager
+    async def lock(self, exam_id: int) -> AsyncIterator[None]:
+        """Serialize payload builds of one exam.
+
+        The lock is dropped once nobody holds or waits for it, so probing
+        unknown ids cannot grow ``_locks``.
+        """
+        entry = self._locks.get(exam_id)
+        if entry is None:
+            entry = self._locks[exam_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[exam_id]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, exam_id: int):
+        entry = self._entries.pop(exam_id, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+exam_payload_cache = ExamPayloadCache(EXAM_CACHE_MAX_ENTRIES, EXAM_CACHE_MAX_BYTES)
+
+
+def _serialize(content) -> bytes:
+    # Same encoding as FastAPI's default JSONResponse
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+async def _build_exam_payload(db: AsyncSession, exam_id: int) -> list[dict]:
+    result = await db.execute(exam_questions_query(exam_id))
     questions = result.scalars().all()
     if not questions:
         return []
     question_ids = [q.id for q in questions]
-    result = await db.execute(
-        select(Answer).where(Answer.question_id.in_(question_ids))
-    )
+    result = await db.execute(question_answers_query(question_ids))
     answers = result.scalars().all()
     from collections import defaultdict
 
@@ -88,3 +208,23 @@ async def get_questions_with_answers_by_exam_id(
         }
         response.append(q_dict)
     return response
+
+
+@router.get("/questions-with-answers/exam/{exam_id}", response_model=list[dict])
+async def get_questions_with_answers_by_exam_id(
+    exam_id: int, db: AsyncSession = Depends(get_read_db)
+):
+    body = exam_payload_cache.get(exam_id)
+    if body is None:
+        # one request builds the payload while the rest of the class waits for it
+        async with exam_payload_cache.lock(exam_id):
+            body = exam_payload_cache.get(exam_id)
+            if body is None:
+                version = exam_version(exam_id)
+                payload = await _build_exam_payload(db, exam_id)
+                body = _serialize(payload)
+                # no questions may mean an exam this process has not seen
+                # created (e.g. by exam_import.py), so it is not cached
+                if payload:
+                    exam_payload_cache.put(exam_id, version, body)
+    return Response(content=body, media_type="application/json")
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import Select, select
 from sqlalchemy.exc import IntegrityError
-from database import get_db, Base
+from database import get_db, get_read_db, Base
+from pagination import Page, PageParams, paginate_rows
+from retrieval import retrieval_index
+from serialization import RowSerializer
+from typing import Annotated, List
+from typing_extensions import TypedDict
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import Column, Integer, String, Text, ForeignKey
 
@@ -24,28 +29,42 @@ class Quizlet(BaseModel):
     answer: str
 
 
-@router.get("/quizlet")
-async def get_quizlets(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(QuizletORM))
-    items = result.scalars().all()
-    return [item.__dict__ for item in items]
+class QuizletOut(TypedDict):
+    id: int
+    lesson_id: int
+    question: str
+    answer: str
 
 
-@router.get("/quizlet/{quizlet_id}")
-async def get_quizlet(quizlet_id: int, db: AsyncSession = Depends(get_db)):
-    item = await db.get(QuizletORM, quizlet_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Quizlet not found")
-    return item.__dict__
+quizlet_rows = RowSerializer(QuizletORM, QuizletOut)
 
 
-@router.get("/quizlet/by-lesson/{lesson_id}")
-async def get_quizlets_by_lesson(lesson_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(QuizletORM).where(QuizletORM.lesson_id == lesson_id)
+@router.get("/quizlet", response_model=Page[QuizletOut])
+async def get_quizlets(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    rows, next_cursor = await paginate_rows(
+        db, quizlet_rows.select(), page, [QuizletORM.id]
     )
-    items = result.scalars().all()
-    return [item.__dict__ for item in items]
+    return quizlet_rows.page(rows, next_cursor)
+
+
+@router.get("/quizlet/{quizlet_id}", response_model=QuizletOut)
+async def get_quizlet(quizlet_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(quizlet_rows.select().where(QuizletORM.id == quizlet_id))
+    return quizlet_rows.one(result.first(), "Quizlet not found")
+
+
+def lesson_quizlets_query(lesson_id: int) -> Select:
+    return quizlet_rows.select().where(QuizletORM.lesson_id == lesson_id)
+
+
+@router.get("/quizlet/by-lesson/{lesson_id}", response_model=List[QuizletOut])
+async def get_quizlets_by_lesson(
+    lesson_id: int, db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(lesson_quizlets_query(lesson_id))
+    return quizlet_rows.many(result.all())
 
 
 @router.post("/quizlet", status_code=201)
@@ -55,6 +74,7 @@ async def create_quizlet(data: Quizlet, db: AsyncSession = Depends(get_db)):
     try:
         await db.commit()
         await db.refresh(item_obj)
+        retrieval_index.index_quizlet(item_obj)
         return item_obj.__dict__
     except IntegrityError as e:
         await db.rollback()
@@ -73,6 +93,7 @@ async def update_quizlet(
     try:
         await db.commit()
         await db.refresh(item_obj)
+        retrieval_index.index_quizlet(item_obj)
         return item_obj.__dict__
     except IntegrityError as e:
         await db.rollback()
@@ -86,4 +107,5 @@ async def delete_quizlet(quizlet_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Quizlet not found")
     await db.delete(item_obj)
     await db.commit()
+    retrieval_index.remove_quizlet(quizlet_id)
     return
@@ -1,26 +1,21 @@
 from fastapi import APIRouter, HTTPException
-import sqlite3
-import os
+from database import ReadSessionLocal
+from Routes.QuestionandAnswerRoute import bump_exam_version
+from leaderboard import leaderboards
+from retrieval import retrieval_index
+from snapshot import reset_database
 
 router = APIRouter()
 
-SQL_PATH = os.path.join(
-    os.path.dirname(os.path.dirname(__file__)), "progresso_data.sql"
-)
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "storage.db")
-
 
 @router.post("/reset-db")
-def reset_db():
+async def reset_db():
     try:
-        with open(SQL_PATH, "r", encoding="utf-8") as f:
-            sql_script = f.read()
-        conn = sqlite3.connect(DB_PATH)
-        try:
-            conn.executescript(sql_script)
-            conn.commit()
-        finally:
-            conn.close()
+        await reset_database()
+        async with ReadSessionLocal() as session:
+            await retrieval_index.build(session)
+            await leaderboards.build(session)
+        bump_exam_version()
         return {"message": "Database reset successfully."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database reset failed: {e}")
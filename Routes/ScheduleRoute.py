@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter
+from sqlalchemy import Select, delete, or_, select
 from sqlalchemy.exc import IntegrityError
-from database import get_db, Base
+from database import get_db, get_read_db, Base
+from ical import occurrences, iter_calendar
+from pagination import Page, PageParams, paginate_rows
+from serialization import RowSerializer
+from typing import Annotated, List, Literal, Optional
+from typing_extensions import TypedDict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import Column, Integer, String, Text, Date, Time, ForeignKey
-from datetime import datetime, date, time
+from sqlalchemy import Column, Integer, String, Text, Date, Time, ForeignKey, Index
+from datetime import datetime, date, time, timedelta
 
 
 class ScheduleORM(Base):
@@ -17,10 +23,34 @@ class ScheduleORM(Base):
     type = Column(String)
     event_date = Column(Date, nullable=False)
     start_time = Column(Time)
+    __table_args__ = (
+        Index("ix_schedule_user_date_time", "user_id", "event_date", "start_time"),
+    )
+
+
+class ScheduleRecurrenceORM(Base):
+    """Repeat rule of a schedule item, whose own row is the first occurrence."""
+
+    __tablename__ = "schedule_recurrence"
+    schedule_id = Column(Integer, ForeignKey("schedule.id"), primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    freq = Column(String, nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    until = Column(Date)
 
 
 router = APIRouter()
 
+# Widest window a range query may ask for; recurring items are expanded in
+# memory, so the window (not the user's history) bounds the work.
+MAX_RANGE_DAYS = 400
+
+
+class Recurrence(BaseModel):
+    freq: Literal["daily", "weekly", "monthly"]
+    interval: int = Field(1, ge=1, le=366)
+    until: str | None = None  # ISO date string, inclusive
+
 
 class Schedule(BaseModel):
     user_id: int
@@ -29,31 +59,235 @@ class Schedule(BaseModel):
     type: str | None = None
     event_date: str  # ISO date string
     start_time: str | None = None  # ISO time string
+    recurrence: Recurrence | None = None
 
 
-@router.get("/schedule")
-async def get_schedules(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ScheduleORM))
-    items = result.scalars().all()
-    return [item.__dict__ for item in items]
+class RecurrenceOut(TypedDict):
+    freq: str
+    interval: int
+    until: Optional[date]
 
 
-@router.get("/schedule/by-user/{user_id}")
-async def get_schedules_by_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ScheduleORM).where(ScheduleORM.user_id == user_id))
-    items = result.scalars().all()
-    return [item.__dict__ for item in items]
+class ScheduleOut(TypedDict):
+    id: int
+    user_id: int
+    title: str
+    description: Optional[str]
+    type: Optional[str]
+    event_date: date
+    start_time: Optional[time]
+
+
+class ScheduleOccurrence(ScheduleOut):
+    recurrence: Optional[RecurrenceOut]
+
+
+schedule_rows = RowSerializer(ScheduleORM, ScheduleOut)
+occurrence_one = TypeAdapter(ScheduleOccurrence)
+occurrence_list = TypeAdapter(List[ScheduleOccurrence])
+
+# Schedule columns with the (optional) rule, in ScheduleOut order
+_WITH_RULE = schedule_rows.columns + [
+    ScheduleRecurrenceORM.freq.label("freq"),
+    ScheduleRecurrenceORM.interval.label("interval"),
+    ScheduleRecurrenceORM.until.label("until"),
+]
+
+
+def _with_rule():
+    return select(*_WITH_RULE).outerjoin(
+        ScheduleRecurrenceORM, ScheduleRecurrenceORM.schedule_id == ScheduleORM.id
+    )
 
 
-@router.get("/schedule/{schedule_id}")
-async def get_schedule(schedule_id: int, db: AsyncSession = Depends(get_db)):
-    item = await db.get(ScheduleORM, schedule_id)
-    if not item:
+def _occurrence(row, event_date: date) -> dict:
+    item = dict(zip(schedule_rows.keys, row))
+    item["event_date"] = event_date
+    item["recurrence"] = (
+        {"freq": row.freq, "interval": row.interval, "until": row.until}
+        if row.freq
+        else None
+    )
+    return item
+
+
+async def _item_response(
+    db: AsyncSession, schedule_id: int, status_code: int = 200
+) -> Response:
+    """One stored item with its rule, as JSON."""
+    result = await db.execute(_with_rule().where(ScheduleORM.id == schedule_id))
+    row = result.first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    return item.__dict__
+    return Response(
+        content=occurrence_one.dump_json(_occurrence(row, row.event_date)),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def _parse_date(value: str, field: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except Exception:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid {field} format. Use YYYY-MM-DD."
+        )
+
+
+async def _save_recurrence(db: AsyncSession, item_obj: ScheduleORM, data: Schedule):
+    """Replace the rule of ``item_obj`` with ``data.recurrence`` (or none)."""
+    rule = await db.get(ScheduleRecurrenceORM, item_obj.id)
+    if data.recurrence is None:
+        if rule is not None:
+            await db.delete(rule)
+        return
+    until = None
+    if data.recurrence.until:
+        until = _parse_date(data.recurrence.until, "recurrence.until")
+        if until < item_obj.event_date:
+            raise HTTPException(
+                status_code=400, detail="recurrence.until is before event_date."
+            )
+    if rule is None:
+        rule = ScheduleRecurrenceORM(schedule_id=item_obj.id)
+        db.add(rule)
+    rule.user_id = item_obj.user_id
+    rule.freq = data.recurrence.freq
+    rule.interval = data.recurrence.interval
+    rule.until = until
 
 
-@router.post("/schedule", status_code=201)
+@router.get("/schedule", response_model=Page[ScheduleOut])
+async def get_schedules(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    rows, next_cursor = await paginate_rows(
+        db, schedule_rows.select(), page, [ScheduleORM.id]
+    )
+    return schedule_rows.page(rows, next_cursor)
+
+
+def single_items_query(user_id: int, start: date, end: date) -> Select:
+    """One-off items in the window: a range scan of ix_schedule_user_date_time."""
+    return (
+        _with_rule()
+        .where(
+            ScheduleORM.user_id == user_id,
+            ScheduleORM.event_date.between(start, end),
+            ScheduleRecurrenceORM.schedule_id.is_(None),
+        )
+        .order_by(ScheduleORM.event_date, ScheduleORM.start_time, ScheduleORM.id)
+    )
+
+
+def recurring_items_query(user_id: int, start: date, end: date) -> Select:
+    """Recurring items whose rule is still active in the window."""
+    return (
+        select(*_WITH_RULE)
+        .join(
+            ScheduleRecurrenceORM,
+            ScheduleRecurrenceORM.schedule_id == ScheduleORM.id,
+        )
+        .where(
+            ScheduleRecurrenceORM.user_id == user_id,
+            ScheduleORM.event_date <= end,
+            or_(
+                ScheduleRecurrenceORM.until.is_(None),
+                ScheduleRecurrenceORM.until >= start,
+            ),
+        )
+    )
+
+
+@router.get("/schedule/by-user/{user_id}", response_model=List[ScheduleOccurrence])
+async def get_schedules_by_user(
+    user_id: int,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """A user's schedule items, or their occurrences between ``from`` and
+    ``to`` (inclusive ISO dates) when either is given.
+
+    Within a range, recurring items are expanded to one entry per occurrence,
+    sorted by date and time; without one, every stored item is listed once.
+    """
+    if from_ is None and to is None:
+        result = await db.execute(
+            _with_rule()
+            .where(ScheduleORM.user_id == user_id)
+            .order_by(ScheduleORM.event_date, ScheduleORM.start_time, ScheduleORM.id)
+        )
+        items = [_occurrence(row, row.event_date) for row in result.all()]
+        return Response(
+            content=occurrence_list.dump_json(items), media_type="application/json"
+        )
+    start = _parse_date(from_, "from") if from_ else None
+    end = _parse_date(to, "to") if to else None
+    if start is None:
+        start = end - timedelta(days=MAX_RANGE_DAYS)
+    if end is None:
+        end = start + timedelta(days=MAX_RANGE_DAYS)
+    if end < start:
+        raise HTTPException(status_code=400, detail="to is before from.")
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range is limited to {MAX_RANGE_DAYS} days.",
+        )
+    single = await db.execute(single_items_query(user_id, start, end))
+    items = [_occurrence(row, row.event_date) for row in single.all()]
+    rules = await db.execute(recurring_items_query(user_id, start, end))
+    recurring = [
+        _occurrence(row, day)
+        for row in rules.all()
+        for day in occurrences(
+            row.event_date, row.freq, row.interval, row.until, start, end
+        )
+    ]
+    if recurring:
+        items.extend(recurring)
+        items.sort(
+            key=lambda item: (
+                item["event_date"],
+                item["start_time"] is not None,
+                item["start_time"] or time(),
+                item["id"],
+            )
+        )
+    return Response(
+        content=occurrence_list.dump_json(items), media_type="application/json"
+    )
+
+
+@router.get("/schedule/by-user/{user_id}/calendar.ics")
+async def export_calendar(user_id: int):
+    """The user's schedule as an iCalendar file, streamed in chunks.
+
+    Recurring items are written once with an RRULE, so the file stays as
+    small as the stored schedule.
+    """
+    stmt = (
+        _with_rule()
+        .where(ScheduleORM.user_id == user_id)
+        .order_by(ScheduleORM.event_date, ScheduleORM.start_time, ScheduleORM.id)
+    )
+    return StreamingResponse(
+        iter_calendar(stmt),
+        media_type="text/calendar; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="schedule-{user_id}.ics"'
+        },
+    )
+
+
+@router.get("/schedule/{schedule_id}", response_model=ScheduleOccurrence)
+async def get_schedule(schedule_id: int, db: AsyncSession = Depends(get_read_db)):
+    return await _item_response(db, schedule_id)
+
+
+@router.post("/schedule", response_model=ScheduleOccurrence, status_code=201)
 async def create_schedule(data: Schedule, db: AsyncSession = Depends(get_db)):
     try:
         event_date_obj = datetime.strptime(data.event_date, "%Y-%m-%d").date()
@@ -79,15 +313,17 @@ async def create_schedule(data: Schedule, db: AsyncSession = Depends(get_db)):
     )
     db.add(item_obj)
     try:
+        await db.flush()
+        schedule_id = item_obj.id
+        await _save_recurrence(db, item_obj, data)
         await db.commit()
-        await db.refresh(item_obj)
-        return item_obj.__dict__
     except IntegrityError as e:
         await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    return await _item_response(db, schedule_id, status_code=201)
 
 
-@router.put("/schedule/{schedule_id}")
+@router.put("/schedule/{schedule_id}", response_model=ScheduleOccurrence)
 async def update_schedule(
     schedule_id: int, data: Schedule, db: AsyncSession = Depends(get_db)
 ):
@@ -116,12 +352,12 @@ async def update_schedule(
     item_obj.event_date = event_date_obj
     item_obj.start_time = start_time_obj
     try:
+        await _save_recurrence(db, item_obj, data)
         await db.commit()
-        await db.refresh(item_obj)
-        return item_obj.__dict__
     except IntegrityError as e:
         await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    return await _item_response(db, schedule_id)
 
 
 @router.delete("/schedule/{schedule_id}", status_code=204)
@@ -129,6 +365,11 @@ async def delete_schedule(schedule_id: int, db: AsyncSession = Depends(get_db)):
     item_obj = await db.get(ScheduleORM, schedule_id)
     if not item_obj:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    await db.execute(
+        delete(ScheduleRecurrenceORM).where(
+            ScheduleRecurrenceORM.schedule_id == schedule_id
+        )
+    )
     await db.delete(item_obj)
     await db.commit()
     return
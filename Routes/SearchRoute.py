@@ -0,0 +1,144 @@
+import re
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Annotated, Literal, Optional
+from typing_extensions import TypedDict
+from pydantic import Field
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_db
+from pagination import Page, PageParams, decode_cursor, encode_cursor
+
+router = APIRouter()
+
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+SNIPPET_TOKENS = 16
+
+# One SELECT per searchable kind over the FTS5 mirrors from migration 3.
+# Every branch yields the same columns; ``rank`` is bm25 (lower is better),
+# with lesson titles weighted above descriptions and bodies.
+_BRANCHES = {
+    "lesson": """
+        SELECT 'lesson' AS kind, lessons.id AS id, lessons.topic_id AS topic_id,
+            NULL AS exam_id, NULL AS lesson_id,
+            highlight(lessons_fts, 0, :open, :close) AS title,
+            snippet(lessons_fts, -1, :open, :close, '…', :tokens) AS snippet,
+            bm25(lessons_fts, 10.0, 5.0, 1.0) AS rank
+        FROM lessons_fts JOIN lessons ON lessons.id = lessons_fts.rowid
+        WHERE lessons_fts MATCH :match {topic}
+    """,
+    "question": """
+        SELECT 'question' AS kind, questions.id AS id,
+            questions.topic_id AS topic_id, questions.exam_id AS exam_id,
+            NULL AS lesson_id, NULL AS title,
+            snippet(questions_fts, -1, :open, :close, '…', :tokens) AS snippet,
+            bm25(questions_fts) AS rank
+        FROM questions_fts JOIN questions ON questions.id = questions_fts.rowid
+        WHERE questions_fts MATCH :match {topic}
+    """,
+    "quizlet": """
+        SELECT 'quizlet' AS kind, quizlet.id AS id, lessons.topic_id AS topic_id,
+            NULL AS exam_id, quizlet.lesson_id AS lesson_id,
+            highlight(quizlet_fts, 0, :open, :close) AS title,
+            snippet(quizlet_fts, 1, :open, :close, '…', :tokens) AS snippet,
+            bm25(quizlet_fts, 2.0, 1.0) AS rank
+        FROM quizlet_fts JOIN quizlet ON quizlet.id = quizlet_fts.rowid
+            LEFT JOIN lessons ON lessons.id = quizlet.lesson_id
+        WHERE quizlet_fts MATCH :match {topic}
+    """,
+}
+_TOPIC_FILTER = {
+    "lesson": "AND lessons.topic_id = :topic_id",
+    "question": "AND questions.topic_id = :topic_id",
+    "quizlet": "AND lessons.topic_id = :topic_id",
+}
+
+_WORD = re.compile(r"\w+")
+
+
+class SearchParams(PageParams):
+    q: str = Field(..., min_length=1, max_length=200)
+    topic_id: Optional[int] = None
+    kind: Optional[Literal["lesson", "question", "quizlet"]] = None
+
+
+class SearchHit(TypedDict):
+    kind: str
+    id: int
+    topic_id: Optional[int]
+    exam_id: Optional[int]
+    lesson_id: Optional[int]
+    title: Optional[str]
+    snippet: Optional[str]
+    score: float
+
+
+def match_expression(q: str) -> str:
+    """Quote every word of the user's query; the last one matches as a prefix.
+
+    Quoting keeps FTS5 operators and punctuation in user input from being
+    parsed as query syntax.
+    """
+    words = _WORD.findall(q)
+    if not words:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search_sql(kinds, topic_id: Optional[int], after: bool) -> str:
+    # Each branch is cut to the page size on its own, so SQLite only sorts the
+    # best ``limit + 1`` hits per kind before merging them.
+    keyset = "WHERE (rank, kind, id) > (:after_rank, :after_kind, :after_id)"
+    branches = [
+        "SELECT * FROM (SELECT * FROM ("
+        + _BRANCHES[kind].format(topic=_TOPIC_FILTER[kind] if topic_id else "")
+        + f") {keyset if after else ''} ORDER BY rank, id LIMIT :limit)"
+        for kind in kinds
+    ]
+    return " UNION ALL ".join(branches) + " ORDER BY rank, kind, id LIMIT :limit"
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    # seeded lesson bodies store markdown newlines as a literal backslash-n
+    return value.replace("\\n", " ") if value else value
+
+
+@router.get("/search", response_model=Page[SearchHit])
+async def search(
+    page: Annotated[SearchParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    """Ranked full-text search over lessons, exam questions and flashcards."""
+    params = {
+        "match": match_expression(page.q),
+        "open": HIGHLIGHT_OPEN,
+        "close": HIGHLIGHT_CLOSE,
+        "tokens": SNIPPET_TOKENS,
+        "topic_id": page.topic_id,
+        "limit": page.limit + 1,
+    }
+    if page.cursor:
+        after_rank, after_kind, after_id = decode_cursor(page.cursor, 3)
+        params.update(after_rank=after_rank, after_kind=after_kind, after_id=after_id)
+    kinds = [page.kind] if page.kind else list(_BRANCHES)
+    sql = search_sql(kinds, page.topic_id, after=bool(page.cursor))
+    rows = (await db.execute(text(sql), params)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last["rank"], last["kind"], last["id"]])
+    items = [
+        {
+            "kind": row["kind"],
+            "id": row["id"],
+            "topic_id": row["topic_id"],
+            "exam_id": row["exam_id"],
+            "lesson_id": row["lesson_id"],
+            "title": _clean(row["title"]),
+            "snippet": _clean(row["snippet"]),
+            "score": -row["rank"],
+        }
+        for row in rows
+    ]
+    return {"items": items, "next_cursor": next_cursor}
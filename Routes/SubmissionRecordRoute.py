@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Annotated, Optional, List
+from collections import Counter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import Select, select, delete
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import Column, Integer, DateTime
-from database import get_db, Base
+from sqlalchemy import Column, Integer, DateTime, Index
+from database import get_db, get_read_db, Base
+from exam_stats import pair_stats, record_choice_changes
+from pagination import Page, PageParams, paginate
+from streaming import ndjson_response
+from Routes.SubmissionRoute import Submission
 import datetime
 
 router = APIRouter()
@@ -19,6 +25,31 @@ class SubmissionRecord(Base):
     question_id = Column(Integer, nullable=False)
     chosen_answer_id = Column(Integer, nullable=False)
 
+    __table_args__ = (
+        Index(
+            "ux_submission_record_choice",
+            "submission_id",
+            "question_id",
+            "chosen_answer_id",
+            unique=True,
+        ),
+    )
+
+
+# Rows per INSERT statement; keeps bound parameters well under SQLite's limit.
+BATCH_INSERT_CHUNK = 500
+
+# A choice may be recorded once per submission and question
+# (ux_submission_record_choice).
+DUPLICATE_CHOICE = "This answer is already recorded for the question."
+
+
+def integrity_error(e: IntegrityError) -> HTTPException:
+    """409 for a duplicate choice, 400 for an unknown id it refers to."""
+    if "UNIQUE constraint failed" in str(e.orig):
+        return HTTPException(status_code=409, detail=DUPLICATE_CHOICE)
+    return HTTPException(status_code=400, detail=str(e))
+
 
 class SubmissionRecordCreate(BaseModel):
     submission_id: int
@@ -56,7 +87,17 @@ async def create_submission_record(
         question_id=payload.question_id,
         chosen_answer_id=payload.chosen_answer_id,
     )
+    pairs = [(payload.submission_id, payload.question_id)]
+    before = await pair_stats(db, pairs)
     db.add(rec)
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        await db.rollback()
+        raise integrity_error(e)
+    await record_choice_changes(
+        db, pairs, before, Counter({(rec.chosen_answer_id, rec.question_id): 1})
+    )
     await db.commit()
     await db.refresh(rec)
     return rec
@@ -72,61 +113,87 @@ async def create_submission_record_batch(
 ):
     if not payload:
         return []
-    created = []
-    updated = []
-
-    async with db.begin():
-        for item in payload:
-            # if this exact choice already exists (allow multiple answers per question), skip
-            res = await db.execute(
-                select(SubmissionRecord).where(
-                    SubmissionRecord.submission_id == item.submission_id,
-                    SubmissionRecord.question_id == item.question_id,
-                    SubmissionRecord.chosen_answer_id == item.chosen_answer_id,
-                )
+
+    # one ownership check per distinct submission
+    owners = {}
+    for item in payload:
+        if owners.setdefault(item.submission_id, item.user_id) != item.user_id:
+            raise HTTPException(
+                status_code=400,
+                detail=f"user_id mismatch for submission_id={item.submission_id}",
             )
-            existing = res.scalars().first()
-            if existing:
-                # duplicate exact choice, skip
-                continue
-            # ensure no user mismatch for the submission (optional safety)
-            res2 = await db.execute(
-                select(SubmissionRecord).where(
-                    SubmissionRecord.submission_id == item.submission_id,
-                )
+    result = await db.execute(
+        select(Submission.id, Submission.user_id).where(Submission.id.in_(owners))
+    )
+    stored = dict(result.all())
+    for submission_id, user_id in owners.items():
+        if submission_id not in stored:
+            raise HTTPException(
+                status_code=404, detail=f"Submission {submission_id} not found"
             )
-            first_for_submission = res2.scalars().first()
-            if first_for_submission and first_for_submission.user_id != item.user_id:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"user_id mismatch for submission_id={item.submission_id}",
-                )
-            rec = SubmissionRecord(
-                submission_id=item.submission_id,
-                user_id=item.user_id,
-                question_id=item.question_id,
-                chosen_answer_id=item.chosen_answer_id,
+        if stored[submission_id] != user_id:
+            raise HTTPException(
+                status_code=400,
+                detail=f"user_id mismatch for submission_id={submission_id}",
             )
-            db.add(rec)
-            await db.flush()  # ensure rec.id is populated
-            created.append(rec)
-
-    # refresh all affected instances and return them
-    for r in created + updated:
-        await db.refresh(r)
 
-    return created + updated
+    rows = [item.dict() for item in payload]
+    pairs = {(row["submission_id"], row["question_id"]) for row in rows}
+    before = await pair_stats(db, pairs)
+    created = []
+    try:
+        for i in range(0, len(rows), BATCH_INSERT_CHUNK):
+            # exact duplicate choices hit the unique index and are skipped
+            stmt = (
+                insert(SubmissionRecord)
+                .values(rows[i : i + BATCH_INSERT_CHUNK])
+                .on_conflict_do_nothing(
+                    index_elements=["submission_id", "question_id", "chosen_answer_id"]
+                )
+                .returning(
+                    SubmissionRecord.id,
+                    SubmissionRecord.submission_id,
+                    SubmissionRecord.user_id,
+                    SubmissionRecord.question_id,
+                    SubmissionRecord.chosen_answer_id,
+                )
+            )
+            result = await db.execute(stmt)
+            created.extend(row._asdict() for row in result.all())
+        picks = Counter(
+            (row["chosen_answer_id"], row["question_id"]) for row in created
+        )
+        await record_choice_changes(db, pairs, before, picks)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    return created
 
 
-@router.get("/submission_record", response_model=List[SubmissionRecordOut])
+@router.get("/submission_record", response_model=Page[SubmissionRecordOut])
 async def list_submission_records(
-    db: AsyncSession = Depends(get_db),
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
 ):
-    stmt = select(SubmissionRecord)
+    rows, next_cursor = await paginate(
+        db, select(SubmissionRecord), page, [SubmissionRecord.id]
+    )
+    return {"items": rows, "next_cursor": next_cursor}
 
-    result = await db.execute(stmt)
-    rows = result.scalars().all()
-    return rows
+
+@router.get("/submission_record/export")
+async def export_submission_records(submission_id: Optional[int] = None):
+    stmt = select(*SubmissionRecord.__table__.c).order_by(SubmissionRecord.id)
+    if submission_id is not None:
+        stmt = stmt.where(SubmissionRecord.submission_id == submission_id)
+    return ndjson_response(stmt, "submission_record.ndjson")
+
+
+def user_records_query(submission_id: int, user_id: int) -> Select:
+    return select(SubmissionRecord).where(
+        SubmissionRecord.submission_id == submission_id,
+        SubmissionRecord.user_id == user_id,
+    )
 
 
 @router.get(
@@ -134,20 +201,15 @@ async def list_submission_records(
     response_model=List[SubmissionRecordOut],
 )
 async def get_records_by_submission_and_user(
-    submission_id: int, user_id: int, db: AsyncSession = Depends(get_db)
+    submission_id: int, user_id: int, db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(
-        select(SubmissionRecord).where(
-            SubmissionRecord.submission_id == submission_id,
-            SubmissionRecord.user_id == user_id,
-        )
-    )
+    result = await db.execute(user_records_query(submission_id, user_id))
     rows = result.scalars().all()
     return rows
 
 
 @router.get("/submission_record/{rec_id}", response_model=SubmissionRecordOut)
-async def get_submission_record(rec_id: int, db: AsyncSession = Depends(get_db)):
+async def get_submission_record(rec_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(
         select(SubmissionRecord).where(SubmissionRecord.id == rec_id)
     )
@@ -167,7 +229,17 @@ async def update_submission_record(
     rec = result.scalars().first()
     if not rec:
         raise HTTPException(status_code=404, detail="SubmissionRecord not found")
+    pairs = [(rec.submission_id, rec.question_id)]
+    before = await pair_stats(db, pairs)
+    picks = Counter({(rec.chosen_answer_id, rec.question_id): -1})
+    picks[(payload.chosen_answer_id, rec.question_id)] += 1
     rec.chosen_answer_id = payload.chosen_answer_id
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        await db.rollback()
+        raise integrity_error(e)
+    await record_choice_changes(db, pairs, before, picks)
     await db.commit()
     await db.refresh(rec)
     return rec
@@ -181,6 +253,12 @@ async def delete_submission_record(rec_id: int, db: AsyncSession = Depends(get_d
     rec = result.scalars().first()
     if not rec:
         raise HTTPException(status_code=404, detail="SubmissionRecord not found")
+    pairs = [(rec.submission_id, rec.question_id)]
+    before = await pair_stats(db, pairs)
     await db.delete(rec)
+    await db.flush()
+    await record_choice_changes(
+        db, pairs, before, Counter({(rec.chosen_answer_id, rec.question_id): -1})
+    )
     await db.commit()
     return None
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Annotated, Optional, List
+from collections import Counter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import Select, select, update, delete, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, Text
-from database import get_db, Base
+from database import get_db, get_read_db, Base
+from exam_stats import pair_stats, record_choice_changes
+from leaderboard import leaderboards, sync_best_grades
+from pagination import Page, PageParams, paginate
+from Routes.ExamRoute import add_attempts, attempt_deltas
+from streaming import ndjson_response
 import datetime
 
 router = APIRouter()
@@ -44,6 +51,32 @@ class SubmissionOut(BaseModel):
         orm_mode = True
 
 
+async def delete_records(db: AsyncSession, submission_id: int):
+    """Delete the submission_record rows of a submission, keeping
+    question_stats and answer_stats in step; the caller commits."""
+    params = {"submission_id": submission_id}
+    result = await db.execute(
+        text(
+            "SELECT submission_id, question_id, chosen_answer_id "
+            "FROM submission_record WHERE submission_id = :submission_id"
+        ),
+        params,
+    )
+    rows = result.all()
+    if not rows:
+        return
+    pairs = {(submission_id, question_id) for submission_id, question_id, _ in rows}
+    before = await pair_stats(db, pairs)
+    picks = Counter((answer_id, question_id) for _, question_id, answer_id in rows)
+    await db.execute(
+        text("DELETE FROM submission_record WHERE submission_id = :submission_id"),
+        params,
+    )
+    await record_choice_changes(
+        db, pairs, before, Counter({key: -n for key, n in picks.items()})
+    )
+
+
 @router.post(
     "/submissions", response_model=SubmissionOut, status_code=status.HTTP_201_CREATED
 )
@@ -58,20 +91,43 @@ async def create_submission(
         upload_time=datetime.datetime.utcnow(),
     )
     db.add(submission)
-    await db.commit()
+    updates = []
+    try:
+        if submission.grade is not None:
+            await db.flush()
+            updates = await sync_best_grades(
+                db, submission.exam_id, [submission.user_id]
+            )
+            await add_attempts(
+                db, submission.exam_id, *attempt_deltas(None, submission.grade)
+            )
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    leaderboards.apply(updates)
     await db.refresh(submission)
     return submission
 
 
-@router.get("/submissions", response_model=List[SubmissionOut])
-async def list_submissions(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Submission))
-    subs = result.scalars().all()
-    return subs
+@router.get("/submissions", response_model=Page[SubmissionOut])
+async def list_submissions(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    subs, next_cursor = await paginate(db, select(Submission), page, [Submission.id])
+    return {"items": subs, "next_cursor": next_cursor}
+
+
+@router.get("/submissions/export")
+async def export_submissions(exam_id: Optional[int] = None):
+    stmt = select(*Submission.__table__.c).order_by(Submission.id)
+    if exam_id is not None:
+        stmt = stmt.where(Submission.exam_id == exam_id)
+    return ndjson_response(stmt, "submissions.ndjson")
 
 
 @router.get("/submissions/{submission_id}", response_model=SubmissionOut)
-async def get_submission(submission_id: int, db: AsyncSession = Depends(get_db)):
+async def get_submission(submission_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Submission).where(Submission.id == submission_id))
     sub = result.scalars().first()
     if not sub:
@@ -87,11 +143,21 @@ async def update_submission(
     sub = result.scalars().first()
     if not sub:
         raise HTTPException(status_code=404, detail="Submission not found")
-    if payload.grade is not None:
-        sub.grade = payload.grade
-    if payload.feedback is not None:
-        sub.feedback = payload.feedback
-    await db.commit()
+    updates = []
+    try:
+        if payload.grade is not None:
+            previous = sub.grade
+            sub.grade = payload.grade
+            await db.flush()
+            updates = await sync_best_grades(db, sub.exam_id, [sub.user_id])
+            await add_attempts(db, sub.exam_id, *attempt_deltas(previous, sub.grade))
+        if payload.feedback is not None:
+            sub.feedback = payload.feedback
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    leaderboards.apply(updates)
     await db.refresh(sub)
     return sub
 
@@ -102,13 +168,27 @@ async def delete_submission(submission_id: int, db: AsyncSession = Depends(get_d
     sub = result.scalars().first()
     if not sub:
         raise HTTPException(status_code=404, detail="Submission not found")
+    # the submission's answers go with it
+    await delete_records(db, submission_id)
     await db.delete(sub)
+    updates = []
+    if sub.grade is not None:
+        await db.flush()
+        updates = await sync_best_grades(db, sub.exam_id, [sub.user_id])
+        await add_attempts(db, sub.exam_id, *attempt_deltas(sub.grade, None))
     await db.commit()
+    leaderboards.apply(updates)
     return None
 
 
+def user_submissions_query(user_id: int) -> Select:
+    return select(Submission).where(Submission.user_id == user_id)
+
+
 @router.get("/submissions/user/{user_id}", response_model=List[SubmissionOut])
-async def list_submissions_by_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Submission).where(Submission.user_id == user_id))
+async def list_submissions_by_user(
+    user_id: int, db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(user_submissions_query(user_id))
     subs = result.scalars().all()
     return subs
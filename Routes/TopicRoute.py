@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from database import get_db, Base
+from database import get_db, get_read_db, Base
+from pagination import Page, PageParams, paginate_rows
+from serialization import RowSerializer
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import Column, Integer, String, Text
 
@@ -22,19 +26,29 @@ class Topic(BaseModel):
     description: str | None = None
 
 
-@router.get("/topics")
-async def get_topics(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(TopicORM))
-    topics = result.scalars().all()
-    return [topic.__dict__ for topic in topics]
+class TopicOut(TypedDict):
+    id: int
+    name: str
+    description: Optional[str]
 
 
-@router.get("/topics/{topic_id}")
-async def get_topic(topic_id: int, db: AsyncSession = Depends(get_db)):
-    topic = await db.get(TopicORM, topic_id)
-    if not topic:
-        raise HTTPException(status_code=404, detail="Topic not found")
-    return topic.__dict__
+topic_rows = RowSerializer(TopicORM, TopicOut)
+
+
+@router.get("/topics", response_model=Page[TopicOut])
+async def get_topics(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    rows, next_cursor = await paginate_rows(
+        db, topic_rows.select(), page, [TopicORM.id]
+    )
+    return topic_rows.page(rows, next_cursor)
+
+
+@router.get("/topics/{topic_id}", response_model=TopicOut)
+async def get_topic(topic_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(topic_rows.select().where(TopicORM.id == topic_id))
+    return topic_rows.one(result.first(), "Topic not found")
 
 
 @router.post("/topics", status_code=201)
@@ -72,5 +86,10 @@ async def delete_topic(topic_id: int, db: AsyncSession = Depends(get_db)):
     if not topic_obj:
         raise HTTPException(status_code=404, detail="Topic not found")
     await db.delete(topic_obj)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # lessons, exams and questions of the topic are kept; move them first
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Topic is still in use")
     return
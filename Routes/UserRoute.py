@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, text
 from sqlalchemy.exc import IntegrityError
-from database import get_db, Base
+from database import get_db, get_read_db, Base
+from leaderboard import leaderboards
+from pagination import Page, PageParams, paginate_rows
+from serialization import RowSerializer
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import Column, Integer, String, Text
 
@@ -30,28 +35,37 @@ class User(BaseModel):
     self_description: str = ""
 
 
-@router.get("/users")
-async def get_users(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(UserORM))
-    users = result.scalars().all()
-    return [user.__dict__ for user in users]
+class UserOut(TypedDict):
+    id: int
+    email: str
+    full_name: Optional[str]
+    avatar_url: Optional[str]
+    class_: Optional[str]
+    school: Optional[str]
+    self_description: Optional[str]
 
 
-@router.get("/users/by-email/{email}")
-async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(UserORM).where(UserORM.email == email))
-    user = result.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.__dict__
+user_rows = RowSerializer(UserORM, UserOut)
 
 
-@router.get("/users/{user_id}")
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    user = await db.get(UserORM, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.__dict__
+@router.get("/users", response_model=Page[UserOut])
+async def get_users(
+    page: Annotated[PageParams, Query()], db: AsyncSession = Depends(get_read_db)
+):
+    rows, next_cursor = await paginate_rows(db, user_rows.select(), page, [UserORM.id])
+    return user_rows.page(rows, next_cursor)
+
+
+@router.get("/users/by-email/{email}", response_model=UserOut)
+async def get_user_by_email(email: str, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(user_rows.select().where(UserORM.email == email))
+    return user_rows.one(result.first(), "User not found")
+
+
+@router.get("/users/{user_id}", response_model=UserOut)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(user_rows.select().where(UserORM.id == user_id))
+    return user_rows.one(result.first(), "User not found")
 
 
 @router.post("/users", status_code=201)
@@ -77,6 +91,7 @@ async def update_user(user_id: int, user: User, db: AsyncSession = Depends(get_d
     try:
         await db.commit()
         await db.refresh(user_obj)
+        leaderboards.set_school(user_id, user_obj.school)
         return user_obj.__dict__
     except IntegrityError as e:
         await db.rollback()
@@ -89,5 +104,18 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     if not user_obj:
         raise HTTPException(status_code=404, detail="User not found")
     await db.delete(user_obj)
-    await db.commit()
+    await db.execute(
+        text("DELETE FROM leaderboard_entries WHERE user_id = :user_id"),
+        {"user_id": user_id},
+    )
+    try:
+        await db.commit()
+    except IntegrityError:
+        # submissions, schedules and progress are kept; delete them first
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="User still has submissions, schedules or lesson progress",
+        )
+    leaderboards.remove_user(user_id)
     return
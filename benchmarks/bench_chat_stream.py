@@ -0,0 +1,49 @@
+"""Time-to-first-token of /gemini-chat/stream vs. /gemini-chat.
+
+Both routes run against benchmarks/fake_gemini.py, so the numbers show
+what streaming saves the user rather than network noise.
+
+    python benchmarks/bench_chat_stream.py --latency 0.3 --tokens 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+from common import asgi_timings, seed_database, summarize
+from fake_gemini import FakeGemini
+
+
+async def main(repeat, fake):
+    seed_database()
+    os.environ["GEMINI_API_URL"] = fake.start()
+    from main import app, lifespan
+
+    async with lifespan(app):
+        results = {}
+        for path in ("/api/v1/gemini-chat", "/api/v1/gemini-chat/stream"):
+            firsts, totals = [], []
+            for i in range(repeat):
+                # unique prompts so the reply cache never answers
+                body = json.dumps({"message": f"bench {path} {i}"}).encode()
+                status, first, total, _ = await asgi_timings(app, "POST", path, body)
+                assert status == 200, (path, status)
+                firsts.append(first)
+                totals.append(total)
+            results[path] = (summarize(firsts), summarize(totals))
+    fake.stop()
+    print(f"{'route':<28} {'first byte p50':>15} {'total p50':>10}")
+    for path, (first, total) in results.items():
+        print(f"{path:<28} {first['p50_ms']:>12.1f} ms {total['p50_ms']:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+    fake = FakeGemini(args.latency, args.tokens, args.token_delay)
+    asyncio.run(main(args.repeat, fake))
@@ -0,0 +1,65 @@
+"""Throughput of POST /exams/import for a streamed JSON Lines question bank.
+
+python benchmarks/bench_exam_import.py --exams 100 --questions 100 --answers 4
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from common import app_client, seed_database
+
+
+def bank(n_exams: int, n_questions: int, n_answers: int) -> bytes:
+    lines = []
+    for i in range(n_exams):
+        questions = [
+            {
+                "content": f"bench question {i}-{j}",
+                "type": "single",
+                "answers": [
+                    {"content": f"answer {k}", "is_correct": k == 0}
+                    for k in range(n_answers)
+                ],
+            }
+            for j in range(n_questions)
+        ]
+        lines.append(
+            json.dumps({"name": f"bench {i}", "topic_id": 1, "questions": questions})
+        )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def main(n_exams: int, n_questions: int, n_answers: int):
+    seed_database()
+    body = bank(n_exams, n_questions, n_answers)
+
+    async def chunks():
+        for i in range(0, len(body), 64 * 1024):
+            yield body[i : i + 64 * 1024]
+
+    async with app_client() as client:
+        start = time.perf_counter()
+        res = await client.post(
+            "/exams/import",
+            content=chunks(),
+            headers={"content-type": "application/x-ndjson"},
+        )
+        elapsed = time.perf_counter() - start
+    assert res.status_code == 201, res.text
+    report = res.json()
+    print(
+        f"{report['imported']} exams, {report['questions']} questions, "
+        f"{report['answers']} answers in {elapsed:.2f}s "
+        f"({report['questions'] / elapsed:,.0f} questions/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--exams", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--answers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.exams, args.questions, args.answers))
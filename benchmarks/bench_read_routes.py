@@ -0,0 +1,75 @@
+"""Requests/sec of the read endpoints, for before/after comparisons.
+
+    python benchmarks/bench_read_routes.py --out after.json
+    python benchmarks/bench_read_routes.py --compare before.json
+
+Run it once on the commit before a change with ``--out before.json`` and
+again after it with ``--compare before.json``.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from common import app_client, seed_database
+
+ROUTES = [
+    "/users",
+    "/users/1",
+    "/users/by-email/student1@gmail.com",
+    "/topics",
+    "/topics/1",
+    "/lessons",
+    "/lessons/1",
+    "/quizlet",
+    "/quizlet/1",
+    "/quizlet/by-lesson/1",
+    "/schedule",
+    "/schedule/by-user/1",
+    "/lessons-completed",
+    "/lessons-completed/by-user/1",
+]
+
+
+async def requests_per_second(client, path, total, concurrency):
+    async def worker(count):
+        for _ in range(count):
+            res = await client.get(path)
+            assert res.status_code == 200, (path, res.status_code)
+
+    per_worker = max(1, total // concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - start)
+
+
+async def main(total, concurrency, out, compare):
+    seed_database()
+    baseline = {}
+    if compare:
+        with open(compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = {}
+    async with app_client() as client:
+        print(f"{'route':<36} {'req/s':>9} {'before':>9} {'ratio':>7}")
+        for path in ROUTES:
+            await requests_per_second(client, path, concurrency, concurrency)
+            rps = await requests_per_second(client, path, total, concurrency)
+            results[path] = round(rps, 1)
+            before = baseline.get(path)
+            ratio = f"{rps / before:>6.2f}x" if before else ""
+            print(f"{path:<36} {rps:>9.1f} {before or '':>9} {ratio:>7}")
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.out, args.compare))
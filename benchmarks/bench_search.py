@@ -0,0 +1,96 @@
+"""Latency of GET /search on a large synthetic corpus.
+
+    python benchmarks/bench_search.py --rows 100000
+
+Adds ``--rows`` lessons, questions and flashcards (split 20/30/50) of
+random text to the seed database, lets startup build the FTS5 tables, then
+times a mix of rare, common, prefix and topic-filtered queries.
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+
+from common import BENCH_DB_PATH, app_client, seed_database, summarize, timed
+
+COMMON_WORDS = ["angle", "equation", "triangle", "circle", "area", "function"]
+
+
+def add_corpus(rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    vocab = [f"w{n}" for n in range(20000)] + COMMON_WORDS * 200
+
+    def words(n):
+        return " ".join(rng.choice(vocab) for _ in range(n))
+
+    lessons, questions, cards = rows // 5, rows * 3 // 10, rows // 2
+    conn = sqlite3.connect(BENCH_DB_PATH)
+    try:
+        topics = [row[0] for row in conn.execute("SELECT id FROM topics")]
+        exams = [row[0] for row in conn.execute("SELECT id FROM exams")]
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM lessons").fetchone()[0]
+        conn.executemany(
+            "INSERT INTO lessons (topic_id, title, content, short_describe) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (rng.choice(topics), words(4), words(150), words(12))
+                for _ in range(lessons)
+            ),
+        )
+        lesson_ids = range(start + 1, start + lessons + 1)
+        conn.executemany(
+            "INSERT INTO questions (exam_id, topic_id, content, type) "
+            "VALUES (?, ?, ?, 'single')",
+            (
+                (rng.choice(exams), rng.choice(topics), words(20))
+                for _ in range(questions)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO quizlet (lesson_id, question, answer) VALUES (?, ?, ?)",
+            ((rng.choice(lesson_ids), words(10), words(8)) for _ in range(cards)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+QUERIES = {
+    "rare word": {"q": "w1234"},
+    "common word": {"q": "triangle"},
+    "two words": {"q": "circle area"},
+    "prefix": {"q": "w99"},
+    "common + topic": {"q": "angle", "topic_id": 1},
+    "flashcards only": {"q": "equation", "kind": "quizlet"},
+}
+
+
+async def main(rows, repeat):
+    seed_database()
+    start = time.perf_counter()
+    add_corpus(rows)
+    print(f"inserted {rows} rows in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    async with app_client() as client:
+        print(f"startup (FTS rebuild) {time.perf_counter() - start:.1f}s")
+        print(f"{'query':<18} {'p50 ms':>8} {'p95 ms':>8} {'hits':>5}")
+        for name, params in QUERIES.items():
+
+            async def call():
+                res = await client.get("/search", params=params)
+                assert res.status_code == 200, res.text
+                return res
+
+            hits = len((await call()).json()["items"])
+            stats = summarize(await timed(call, repeat))
+            print(f"{name:<18} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {hits:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
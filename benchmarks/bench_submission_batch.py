@@ -0,0 +1,75 @@
+"""Latency of POST /submission_record/batch as the batch size grows.
+
+python benchmarks/bench_submission_batch.py --sizes 1 10 50 200 1000
+"""
+
+import argparse
+import asyncio
+import sqlite3
+
+from common import BENCH_DB_PATH, app_client, seed_database, summarize, timed
+
+
+def add_bench_exam(n_questions: int) -> list:
+    """Insert an exam with one answer per question; return (question, answer) ids."""
+    conn = sqlite3.connect(BENCH_DB_PATH)
+    try:
+        exam_id = conn.execute(
+            "INSERT INTO exams (name, topic_id) VALUES ('bench', 1)"
+        ).lastrowid
+        pairs = []
+        for i in range(n_questions):
+            question_id = conn.execute(
+                "INSERT INTO questions (exam_id, topic_id, content, type) "
+                "VALUES (?, 1, ?, 'single')",
+                (exam_id, f"q{i}"),
+            ).lastrowid
+            answer_id = conn.execute(
+                "INSERT INTO answers (question_id, content, is_correct) "
+                "VALUES (?, 'a', 1)",
+                (question_id,),
+            ).lastrowid
+            pairs.append((question_id, answer_id))
+        conn.commit()
+        return pairs
+    finally:
+        conn.close()
+
+
+async def main(sizes, repeat):
+    seed_database()
+    pairs = add_bench_exam(max(sizes))
+    async with app_client() as client:
+        print(f"{'batch':>6} {'p50 ms':>9} {'p95 ms':>9} {'ms/row':>8}")
+        for size in sizes:
+
+            async def submit_batch():
+                res = await client.post(
+                    "/submissions", json={"user_id": 1, "exam_id": 1}
+                )
+                submission_id = res.json()["id"]
+                payload = [
+                    {
+                        "submission_id": submission_id,
+                        "user_id": 1,
+                        "question_id": question_id,
+                        "chosen_answer_id": answer_id,
+                    }
+                    for question_id, answer_id in pairs[:size]
+                ]
+                res = await client.post("/submission_record/batch", json=payload)
+                assert res.status_code == 201, res.text
+
+            stats = summarize(await timed(submit_batch, repeat))
+            print(
+                f"{size:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                f"{stats['p50_ms'] / size:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
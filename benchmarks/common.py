@@ -0,0 +1,113 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run the FastAPI app in-process against a throwaway copy of the
+seed database, so they never touch ./storage.db. Import this module before
+anything that imports ``database``: it points DATABASE_URL at the temp file.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BENCH_DB_PATH = os.getenv(
+    "BENCH_DB_PATH",
+    os.path.join(tempfile.mkdtemp(prefix="progresso-bench-"), "bench.db"),
+)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{BENCH_DB_PATH}"
+
+
+def seed_database(path: str = BENCH_DB_PATH):
+    from snapshot import clone_template
+
+    clone_template(path)
+
+
+@asynccontextmanager
+async def app_client():
+    """Yield an httpx client bound to the app over the ASGI transport."""
+    import httpx
+    from main import app, lifespan
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench/api/v1"
+        ) as client:
+            yield client
+
+
+async def timed(coro_factory, repeat: int):
+    """Await ``coro_factory()`` ``repeat`` times and return latencies in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+    }
+
+
+async def asgi_timings(app, method: str, path: str, body: bytes = b""):
+    """Call the ASGI app directly; return (status, first_body_ms, total_ms, body).
+
+    Unlike httpx's ASGI transport this sees each body chunk as it is sent,
+    so it can measure time-to-first-byte of streaming responses.
+    """
+    start = time.perf_counter()
+    first = None
+    status = None
+    chunks = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal first, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if first is None:
+                first = (time.perf_counter() - start) * 1000
+            chunks.append(message["body"])
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    total = (time.perf_counter() - start) * 1000
+    return status, first, total, b"".join(chunks)
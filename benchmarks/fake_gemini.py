@@ -0,0 +1,89 @@
+"""Local stand-in for the Gemini API, served in a background thread.
+
+Implements ``:generateContent`` and ``:streamGenerateContent?alt=sse`` with
+configurable latency so AI routes can be benchmarked without the network.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+MODEL = "fake-gemini"
+
+
+class FakeGemini:
+    def __init__(
+        self, latency: float = 0.2, tokens: int = 20, token_delay: float = 0.02
+    ):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.calls = 0
+        self.app = Starlette(
+            routes=[
+                Route(
+                    f"/models/{MODEL}:generateContent", self.generate, methods=["POST"]
+                ),
+                Route(
+                    f"/models/{MODEL}:streamGenerateContent",
+                    self.stream,
+                    methods=["POST"],
+                ),
+            ]
+        )
+        self.port = None
+        self._server = None
+
+    @staticmethod
+    def _chunk(text: str) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+    async def generate(self, request: Request):
+        self.calls += 1
+        await request.json()
+        await asyncio.sleep(self.latency + self.tokens * self.token_delay)
+        return JSONResponse(
+            self._chunk(" ".join(f"tok{i}" for i in range(self.tokens)))
+        )
+
+    async def stream(self, request: Request):
+        self.calls += 1
+        await request.json()
+
+        async def events():
+            await asyncio.sleep(self.latency)
+            for i in range(self.tokens):
+                yield f"data: {json.dumps(self._chunk(f'tok{i} '))}\r\n\r\n"
+                await asyncio.sleep(self.token_delay)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/models/{MODEL}:generateContent"
+
+    def start(self) -> str:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(
+            self.app, host="127.0.0.1", port=self.port, log_level="warning"
+        )
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, daemon=True).start()
+        deadline = time.time() + 10
+        while not self._server.started and time.time() < deadline:
+            time.sleep(0.01)
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
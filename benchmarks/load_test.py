@@ -0,0 +1,278 @@
+"""Concurrent load test of the main user journeys, with regression checks.
+
+    python benchmarks/load_test.py --duration 10 --concurrency 20 --out run.json
+    python benchmarks/load_test.py --baseline run.json --tolerance 0.2
+
+Each scenario is a loop of requests a client makes for one user action;
+``--concurrency`` virtual users run every selected scenario for
+``--duration`` seconds against a fresh seed database, in-process over the
+ASGI transport. AI chat goes to the local fake upstream.
+
+Per route it reports requests, errors, p50/p95/p99 latency and
+throughput. ``--out`` saves them as JSON; ``--baseline`` compares with a
+saved run and exits non-zero when a route's p95 grows or its throughput
+drops by more than ``--tolerance``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+
+from common import BENCH_DB_PATH, app_client, seed_database, summarize
+from fake_gemini import FakeGemini
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, method, route, path, expect, **kwargs):
+        start = time.perf_counter()
+        res = await client.request(method, path, **kwargs)
+        self.samples[route].append((time.perf_counter() - start) * 1000)
+        if res.status_code != expect:
+            self.errors[route] += 1
+        return res
+
+
+def load_fixtures():
+    """Ids the scenarios pick from: users, exams and each exam's answers."""
+    conn = sqlite3.connect(BENCH_DB_PATH)
+    try:
+        users = [row[0] for row in conn.execute("SELECT id FROM users")]
+        answers = defaultdict(list)
+        for exam_id, question_id, answer_id in conn.execute(
+            "SELECT questions.exam_id, questions.id, answers.id FROM questions "
+            "JOIN answers ON answers.question_id = questions.id"
+        ):
+            answers[exam_id].append((question_id, answer_id))
+        return {"users": users, "exams": sorted(answers), "answers": answers}
+    finally:
+        conn.close()
+
+
+async def exam_open(client, rec, rng, fx):
+    exam_id = rng.choice(fx["exams"])
+    await rec.call(client, "GET", "GET /exams/{id}", f"/exams/{exam_id}", 200)
+    await rec.call(
+        client,
+        "GET",
+        "GET /questions-with-answers/exam/{id}",
+        f"/questions-with-answers/exam/{exam_id}",
+        200,
+    )
+
+
+async def batch_submit(client, rec, rng, fx):
+    user_id = rng.choice(fx["users"])
+    exam_id = rng.choice(fx["exams"])
+    res = await rec.call(
+        client,
+        "POST",
+        "POST /submissions",
+        "/submissions",
+        201,
+        json={"user_id": user_id, "exam_id": exam_id},
+    )
+    if res.status_code != 201:
+        return
+    submission_id = res.json()["id"]
+    by_question = defaultdict(list)
+    for question_id, answer_id in fx["answers"][exam_id]:
+        by_question[question_id].append(answer_id)
+    payload = [
+        {
+            "submission_id": submission_id,
+            "user_id": user_id,
+            "question_id": question_id,
+            "chosen_answer_id": rng.choice(answer_ids),
+        }
+        for question_id, answer_ids in by_question.items()
+    ]
+    await rec.call(
+        client,
+        "POST",
+        "POST /submission_record/batch",
+        "/submission_record/batch",
+        201,
+        json=payload,
+    )
+    await rec.call(
+        client,
+        "POST",
+        "POST /submissions/{id}/grade",
+        f"/submissions/{submission_id}/grade",
+        200,
+    )
+
+
+async def dashboard(client, rec, rng, fx):
+    user_id = rng.choice(fx["users"])
+    for route, path in (
+        ("GET /users/{id}", f"/users/{user_id}"),
+        ("GET /submissions/user/{id}", f"/submissions/user/{user_id}"),
+        (
+            "GET /lessons-completed/by-user/{id}",
+            f"/lessons-completed/by-user/{user_id}",
+        ),
+        ("GET /schedule/by-user/{id}", f"/schedule/by-user/{user_id}"),
+        ("GET /topics", "/topics"),
+        ("GET /lessons", "/lessons?limit=20"),
+    ):
+        await rec.call(client, "GET", route, path, 200)
+
+
+async def dashboard_aggregate(client, rec, rng, fx):
+    user_id = rng.choice(fx["users"])
+    await rec.call(
+        client,
+        "GET",
+        "GET /users/{id}/dashboard",
+        f"/users/{user_id}/dashboard",
+        200,
+    )
+
+
+# A small pool of prompts so the reply cache sees realistic repeats
+PROMPTS = [
+    "Explain the inscribed angle theorem",
+    "How do I solve a quadratic equation?",
+    "What is a system of linear equations?",
+    "How do I factor a polynomial?",
+    "What are the types of triangles?",
+]
+
+
+async def ai_chat(client, rec, rng, fx):
+    message = rng.choice(PROMPTS)
+    if rng.random() < 0.5:
+        message = f"{message} (student {rng.randrange(1000)})"
+    await rec.call(
+        client,
+        "POST",
+        "POST /gemini-chat",
+        "/gemini-chat",
+        200,
+        json={"message": message},
+    )
+
+
+SCENARIOS = {
+    "exam_open": exam_open,
+    "batch_submit": batch_submit,
+    "dashboard": dashboard,
+    "dashboard_aggregate": dashboard_aggregate,
+    "ai_chat": ai_chat,
+}
+
+
+async def run(scenarios, concurrency, duration, seed):
+    seed_database()
+    fixtures = load_fixtures()
+    recorder = Recorder()
+    async with app_client() as client:
+        deadline = time.perf_counter() + duration
+
+        async def virtual_user(n, scenario):
+            rng = random.Random(seed * 1000 + n)
+            while time.perf_counter() < deadline:
+                await scenario(client, recorder, rng, fixtures)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                virtual_user(n, SCENARIOS[name])
+                for name in scenarios
+                for n in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - start
+    results = {}
+    for route, samples in sorted(recorder.samples.items()):
+        stats = summarize(samples)
+        stats["errors"] = recorder.errors[route]
+        stats["rps"] = round(len(samples) / elapsed, 1)
+        results[route] = stats
+    return results
+
+
+def report(results, baseline, tolerance):
+    """Print the results table; return the routes that regressed."""
+    regressions = []
+    print(
+        f"{'route':<40} {'n':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'req/s':>8} {'Δp95':>7} {'Δrps':>7}"
+    )
+    for route, stats in results.items():
+        before = baseline.get(route)
+        delta_p95 = delta_rps = ""
+        if before:
+            p95_change = stats["p95_ms"] / before["p95_ms"] - 1
+            rps_change = stats["rps"] / before["rps"] - 1
+            delta_p95 = f"{p95_change:+.0%}"
+            delta_rps = f"{rps_change:+.0%}"
+            if p95_change > tolerance or rps_change < -tolerance:
+                regressions.append(route)
+        print(
+            f"{route:<40} {stats['n']:>6} {stats['errors']:>4} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+            f"{stats['p99_ms']:>8.2f} {stats['rps']:>8.1f} "
+            f"{delta_p95:>7} {delta_rps:>7}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--upstream-latency", type=float, default=0.2)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fake = None
+    if "ai_chat" in args.scenarios:
+        fake = FakeGemini(latency=args.upstream_latency)
+        # must be set before main (and the Gemini route) is imported
+        os.environ["GEMINI_API_URL"] = fake.start()
+        # the fake has no quota, so do not let admission control cap it
+        os.environ.setdefault("GEMINI_RATE_LIMIT", "100000")
+        os.environ.setdefault("GEMINI_BURST", "100000")
+    try:
+        results = asyncio.run(
+            run(args.scenarios, args.concurrency, args.duration, args.seed)
+        )
+    finally:
+        if fake is not None:
+            fake.stop()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["routes"]
+    regressions = report(results, baseline, args.tolerance)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "routes": results}, f, indent=2)
+    if regressions:
+        print(f"regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import logging
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
@@ -10,11 +11,67 @@ logger = logging.getLogger(__name__)
 # Load the database URL from environment variables
 database_url = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./storage.db")
 
-# Create the database engine
-engine = create_async_engine(database_url, connect_args={"check_same_thread": False})
+# SQLite performance profile, applied to every new connection
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # negative values are KiB, i.e. 64 MB of page cache per connection
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", "ON"),
+}
+
+# SQLite allows one writer at a time; queue writers in the pool instead of
+# letting them fail with "database is locked".
+WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+
+def _apply_pragmas(dbapi_connection, read_only: bool):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+
+def _create_engine(url: str, pool_size: int, read_only: bool):
+    new_engine = create_async_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        _apply_pragmas(dbapi_connection, read_only)
+
+    return new_engine
+
+
+# Create the database engines: one writer, and a read-only pool that WAL lets
+# run alongside it
+engine = _create_engine(database_url, WRITE_POOL_SIZE, read_only=False)
+if engine.url.database in (None, "", ":memory:"):
+    # an in-memory database is private to its connection; share the writer
+    read_engine = engine
+else:
+    read_engine = _create_engine(
+        os.getenv("DATABASE_READ_URL", database_url), READ_POOL_SIZE, read_only=True
+    )
+
 SessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine, class_=AsyncSession
 )
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=read_engine, class_=AsyncSession
+)
 Base = declarative_base()
 
 
@@ -28,3 +85,15 @@ async def get_db():
             raise
         finally:
             await session.close()
+
+
+# Dependency to get a read-only database session for GET handlers
+async def get_read_db():
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        except Exception as e:
+            logger.error(f"Database session error: {e}")
+            raise
+        finally:
+            await session.close()
@@ -0,0 +1,258 @@
+"""Bulk import of complete exams: the exam row, its questions and answers.
+
+A document is one exam with its questions nested inside, and each question
+with its answers:
+
+    {"name": "Algebra 2025", "year": 2025, "topic_id": 1,
+     "questions": [{"content": "2 + 2 = ?", "type": "single",
+                    "answers": [{"content": "4", "is_correct": true},
+                                {"content": "5", "is_correct": false}]}]}
+
+Input is either JSON (one document or an array of them) or JSON Lines (one
+document per line, read as it arrives). Every exam is inserted in its own
+transaction, with one multi-row INSERT per 500 questions or answers instead
+of a round trip per row. An invalid exam is reported by its position and
+skipped without touching the others:
+
+    python exam_import.py bank.jsonl [more.json ...]
+
+imports into the database of ``DATABASE_URL`` (./storage.db by default). A
+running server serves the new exams right away; ``POST /api/v1/exams/import``
+does the same through the API.
+"""
+
+import json
+import logging
+import sys
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, List, Literal
+from typing import Optional, Tuple
+from typing_extensions import TypedDict
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("exam_import")
+
+# Rows per INSERT; at most 4 parameters each, well under SQLite's limit
+_CHUNK = 500
+
+JSON_LINES_TYPES = ("application/x-ndjson", "application/jsonl", "application/x-jsonl")
+
+
+class AnswerDocument(BaseModel):
+    content: str = Field(..., min_length=1)
+    is_correct: bool = False
+
+
+class QuestionDocument(BaseModel):
+    content: str = Field(..., min_length=1)
+    type: Literal["single", "multiple"]
+    topic_id: Optional[int] = None  # defaults to the exam's topic
+    answers: List[AnswerDocument] = Field(..., min_length=2)
+
+    @model_validator(mode="after")
+    def check_correct_answers(self):
+        correct = sum(answer.is_correct for answer in self.answers)
+        if self.type == "single" and correct != 1:
+            raise ValueError("a 'single' question needs exactly one correct answer")
+        if correct == 0:
+            raise ValueError("a question needs at least one correct answer")
+        return self
+
+
+class ExamDocument(BaseModel):
+    name: str = Field(..., min_length=1)
+    year: Optional[int] = None
+    province: Optional[str] = None
+    topic_id: Optional[int] = None
+    rating: Optional[int] = None
+    added_on: Optional[str] = None
+    questions: List[QuestionDocument] = Field(..., min_length=1)
+
+    @model_validator(mode="after")
+    def check_topics(self):
+        if self.topic_id is None and any(q.topic_id is None for q in self.questions):
+            raise ValueError("every question needs a topic_id, or the exam one")
+        return self
+
+
+class ExamImportError(Exception):
+    """An exam that cannot be imported as given; nothing of it is kept."""
+
+
+class ImportFailure(TypedDict):
+    index: int
+    error: str
+
+
+class ImportReport(TypedDict):
+    imported: int
+    questions: int
+    answers: int
+    exam_ids: List[int]
+    errors: List[ImportFailure]
+
+
+def _multi_insert(table: str, columns: List[str], rows: List[tuple]) -> Tuple:
+    params = {}
+    values = []
+    for n, row in enumerate(rows):
+        names = [f"{column}_{n}" for column in columns]
+        params.update(zip(names, row))
+        values.append(f"({', '.join(':' + name for name in names)})")
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join(values)}"
+    return sql, params
+
+
+async def import_exam(db: AsyncSession, doc: ExamDocument) -> Tuple[int, int, int]:
+    """Insert one exam in the caller's transaction.
+
+    Returns ``(exam_id, questions, answers)``; the caller commits.
+    """
+    result = await db.execute(
+        text(
+            "INSERT INTO exams (name, year, province, topic_id, rating, "
+            "student_attempt, correct_attempt, added_on) VALUES (:name, :year, "
+            ":province, :topic_id, :rating, 0, 0, :added_on) RETURNING id"
+        ),
+        doc.model_dump(exclude={"questions"}),
+    )
+    exam_id = result.scalar_one()
+    answers = []
+    for i in range(0, len(doc.questions), _CHUNK):
+        chunk = doc.questions[i : i + _CHUNK]
+        sql, params = _multi_insert(
+            "questions",
+            ["exam_id", "topic_id", "content", "type"],
+            [(exam_id, q.topic_id or doc.topic_id, q.content, q.type) for q in chunk],
+        )
+        result = await db.execute(text(sql + " RETURNING id"), params)
+        # RETURNING order is unspecified, but one statement assigns rowids in
+        # VALUES order while we hold the write lock: sorted ids map 1:1
+        ids = sorted(result.scalars().all())
+        if ids[-1] - ids[0] != len(ids) - 1:
+            raise ExamImportError("question ids of one insert are not contiguous")
+        for question_id, question in zip(ids, chunk):
+            answers.extend(
+                (question_id, answer.content, answer.is_correct)
+                for answer in question.answers
+            )
+    for i in range(0, len(answers), _CHUNK):
+        sql, params = _multi_insert(
+            "answers",
+            ["question_id", "content", "is_correct"],
+            answers[i : i + _CHUNK],
+        )
+        await db.execute(text(sql), params)
+    return exam_id, len(doc.questions), len(answers)
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'document'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+async def import_documents(
+    db: AsyncSession, documents: AsyncIterable[Any]
+) -> ImportReport:
+    """Validate and import each document, committing one exam at a time.
+
+    Items are decoded JSON values, or ``str``/``bytes`` holding one.
+    """
+    report: ImportReport = {
+        "imported": 0,
+        "questions": 0,
+        "answers": 0,
+        "exam_ids": [],
+        "errors": [],
+    }
+    index = -1
+    async for raw in documents:
+        index += 1
+        try:
+            if isinstance(raw, (str, bytes)):
+                doc = ExamDocument.model_validate_json(raw)
+            else:
+                doc = ExamDocument.model_validate(raw)
+        except ValidationError as e:
+            report["errors"].append({"index": index, "error": _describe(e)})
+            continue
+        try:
+            exam_id, questions, answers = await import_exam(db, doc)
+            await db.commit()
+        except (IntegrityError, ExamImportError) as e:
+            await db.rollback()
+            error = str(e.orig) if isinstance(e, IntegrityError) else str(e)
+            report["errors"].append({"index": index, "error": error})
+            continue
+        except Exception:
+            # never leave a half-inserted exam in the open transaction
+            await db.rollback()
+            raise
+        report["imported"] += 1
+        report["questions"] += questions
+        report["answers"] += answers
+        report["exam_ids"].append(exam_id)
+    return report
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Non-blank lines of a byte stream, as soon as each one is complete."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def iter_values(values: Iterable[Any]) -> AsyncIterator[Any]:
+    for value in values:
+        yield value
+
+
+def parse_json(body: bytes) -> List[Any]:
+    """Documents of a JSON body: one exam object or an array of them."""
+    value = json.loads(body)
+    return value if isinstance(value, list) else [value]
+
+
+async def _import_files(paths: List[str]) -> int:
+    """Import every file; return the number of rejected documents."""
+    from database import SessionLocal
+
+    failures = 0
+    async with SessionLocal() as session:
+        for path in paths:
+            start = time.perf_counter()
+            with open(path, "rb") as f:
+                if path.endswith((".jsonl", ".ndjson")):
+                    documents = iter_values(line for line in f if line.strip())
+                else:
+                    documents = iter_values(parse_json(f.read()))
+                report = await import_documents(session, documents)
+            failures += len(report["errors"])
+            for failure in report["errors"]:
+                logger.error(f"{path}[{failure['index']}]: {failure['error']}")
+            logger.info(
+                f"{path}: imported {report['imported']:,} exams, "
+                f"{report['questions']:,} questions and {report['answers']:,} "
+                f"answers in {time.perf_counter() - start:.2f}s"
+            )
+    return failures
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    logging.basicConfig(level=logging.INFO)
+    if not sys.argv[1:]:
+        sys.exit(__doc__)
+    sys.exit(1 if asyncio.run(_import_files(sys.argv[1:])) else 0)
@@ -0,0 +1,200 @@
+"""Per-question difficulty statistics, maintained from submission_record writes.
+
+``question_stats`` counts, per question, the submissions that answered it
+(``attempts``) and those whose choices were exactly right (``correct``, with
+the grading route's rules). ``answer_stats`` counts how often each answer
+was picked, which is how distractors show up. Both tables are created and
+filled by migration 6; after that every submission_record write adjusts them
+with in-place ``x = x + :d`` updates for just the (submission, question)
+pairs it touched:
+
+    before = await pair_stats(db, pairs)
+    ... insert / update / delete submission_record rows, flush ...
+    await record_choice_changes(db, pairs, before, picks)
+
+``REBUILD_STATEMENTS`` recompute both tables from submission_record, and
+``ATTEMPTS_REBUILD`` the exams' attempt counters from submissions.
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# (submission_id, question_id) pairs per statement, two parameters each
+_CHUNK = 400
+
+# A graded submission at or above this grade counts towards Exam.correct_attempt.
+PASS_GRADE = 5.0
+
+# Choices of each (submission, question) pair, graded like
+# GradingRoute.grade_submissions: answers that do not belong to the question
+# are ignored; a question is right when every pick is correct and, for
+# 'single' questions, there is one pick, for 'multiple' ones, all of them.
+_PAIRS = """
+    SELECT submission_record.question_id AS question_id,
+        COUNT(DISTINCT answers.id) AS picks,
+        COUNT(DISTINCT CASE WHEN answers.is_correct THEN answers.id END) AS hits
+    FROM {records}
+    LEFT JOIN answers ON answers.id = submission_record.chosen_answer_id
+        AND answers.question_id = submission_record.question_id
+    GROUP BY submission_record.submission_id, submission_record.question_id
+"""
+_PER_QUESTION = """
+    SELECT questions.id AS question_id, COUNT(*) AS attempts,
+        SUM(pairs.picks > 0 AND pairs.picks = pairs.hits AND CASE
+            WHEN questions.type = 'single' THEN pairs.picks = 1
+            ELSE pairs.hits = (
+                SELECT COUNT(*) FROM answers
+                WHERE answers.question_id = questions.id AND answers.is_correct
+            )
+        END) AS correct
+    FROM ({pairs}) AS pairs JOIN questions ON questions.id = pairs.question_id
+    GROUP BY questions.id
+"""
+
+REBUILD_STATEMENTS = [
+    "DELETE FROM question_stats",
+    "INSERT INTO question_stats (question_id, attempts, correct) "
+    + _PER_QUESTION.format(pairs=_PAIRS.format(records="submission_record")),
+    "DELETE FROM answer_stats",
+    "INSERT INTO answer_stats (answer_id, picks) "
+    "SELECT answers.id, COUNT(*) FROM submission_record "
+    "JOIN answers ON answers.id = submission_record.chosen_answer_id "
+    "AND answers.question_id = submission_record.question_id GROUP BY answers.id",
+]
+
+# Exam.student_attempt and correct_attempt, as ExamRoute.add_attempts keeps them
+ATTEMPTS_REBUILD = (
+    "UPDATE exams SET student_attempt = (SELECT COUNT(*) FROM submissions "
+    "WHERE submissions.exam_id = exams.id AND submissions.grade IS NOT NULL), "
+    "correct_attempt = (SELECT COUNT(*) FROM submissions "
+    "WHERE submissions.exam_id = exams.id "
+    f"AND submissions.grade >= {PASS_GRADE})"
+)
+
+_ADD_QUESTION = text(
+    "INSERT INTO question_stats (question_id, attempts, correct) "
+    "SELECT id, :attempts, :correct FROM questions WHERE id = :question_id "
+    "ON CONFLICT (question_id) DO UPDATE SET "
+    "attempts = attempts + :attempts, correct = correct + :correct"
+)
+_ADD_PICKS = text(
+    "INSERT INTO answer_stats (answer_id, picks) "
+    "SELECT id, :picks FROM answers "
+    "WHERE id = :answer_id AND question_id = :question_id "
+    "ON CONFLICT (answer_id) DO UPDATE SET picks = picks + :picks"
+)
+
+
+async def pair_stats(
+    db: AsyncSession, pairs: Iterable[Tuple[int, int]]
+) -> Dict[int, Tuple[int, int]]:
+    """``{question_id: (attempts, correct)}`` over the given pairs only."""
+    pairs = sorted(set(pairs))
+    stats: Dict[int, Tuple[int, int]] = {}
+    for i in range(0, len(pairs), _CHUNK):
+        chunk = pairs[i : i + _CHUNK]
+        params = {}
+        values = []
+        for n, (submission_id, question_id) in enumerate(chunk):
+            params[f"s{n}"] = submission_id
+            params[f"q{n}"] = question_id
+            values.append(f"(:s{n}, :q{n})")
+        # CROSS JOIN keeps the pair list as the outer loop, so each pair is
+        # an index lookup instead of a scan of submission_record
+        records = (
+            f"(VALUES {', '.join(values)}) AS wanted CROSS JOIN submission_record "
+            "ON submission_record.submission_id = wanted.column1 "
+            "AND submission_record.question_id = wanted.column2"
+        )
+        sql = _PER_QUESTION.format(pairs=_PAIRS.format(records=records))
+        result = await db.execute(text(sql), params)
+        for question_id, attempts, correct in result.all():
+            stats[question_id] = (attempts, correct)
+    return stats
+
+
+async def record_choice_changes(
+    db: AsyncSession,
+    pairs: Iterable[Tuple[int, int]],
+    before: Dict[int, Tuple[int, int]],
+    picks: Counter,
+):
+    """Apply the change from ``before`` to the current state of ``pairs``.
+
+    ``picks`` maps ``(answer_id, question_id)`` to the number of records
+    choosing it that were added (positive) or removed (negative).
+    """
+    after = await pair_stats(db, pairs)
+    deltas: List[dict] = []
+    for question_id in before.keys() | after.keys():
+        old_attempts, old_correct = before.get(question_id, (0, 0))
+        new_attempts, new_correct = after.get(question_id, (0, 0))
+        if (old_attempts, old_correct) != (new_attempts, new_correct):
+            deltas.append(
+                {
+                    "question_id": question_id,
+                    "attempts": new_attempts - old_attempts,
+                    "correct": new_correct - old_correct,
+                }
+            )
+    if deltas:
+        await db.execute(_ADD_QUESTION, deltas)
+    changed = [
+        {"answer_id": answer_id, "question_id": question_id, "picks": n}
+        for (answer_id, question_id), n in picks.items()
+        if n
+    ]
+    if changed:
+        await db.execute(_ADD_PICKS, changed)
+
+
+async def exam_stats(db: AsyncSession, exam_id: int) -> List[dict]:
+    """Questions of ``exam_id`` with their counters and answer pick counts."""
+    questions = await db.execute(
+        text(
+            "SELECT questions.id, questions.type, "
+            "COALESCE(question_stats.attempts, 0), "
+            "COALESCE(question_stats.correct, 0) FROM questions "
+            "LEFT JOIN question_stats ON question_stats.question_id = questions.id "
+            "WHERE questions.exam_id = :exam_id ORDER BY questions.id"
+        ),
+        {"exam_id": exam_id},
+    )
+    answers = await db.execute(
+        text(
+            "SELECT answers.question_id, answers.id, answers.is_correct, "
+            "COALESCE(answer_stats.picks, 0) FROM questions "
+            "JOIN answers ON answers.question_id = questions.id "
+            "LEFT JOIN answer_stats ON answer_stats.answer_id = answers.id "
+            "WHERE questions.exam_id = :exam_id ORDER BY answers.id"
+        ),
+        {"exam_id": exam_id},
+    )
+    by_question: Dict[int, list] = {}
+    for question_id, answer_id, is_correct, n in answers.all():
+        by_question.setdefault(question_id, []).append(
+            {"answer_id": answer_id, "is_correct": bool(is_correct), "picks": n}
+        )
+    items = []
+    for question_id, qtype, attempts, correct in questions.all():
+        answer_rows = by_question.get(question_id, [])
+        total_picks = sum(row["picks"] for row in answer_rows)
+        for row in answer_rows:
+            row["pick_rate"] = (
+                round(row["picks"] / total_picks, 4) if total_picks else 0.0
+            )
+        items.append(
+            {
+                "question_id": question_id,
+                "type": qtype,
+                "attempts": attempts,
+                "correct": correct,
+                "percent_correct": (
+                    round(100 * correct / attempts, 2) if attempts else 0.0
+                ),
+                "answers": answer_rows,
+            }
+        )
+    return items
@@ -0,0 +1,298 @@
+"""Fill a Progresso database with large, referentially valid synthetic data.
+
+    python generate_data.py --out big.db --users 20000 --submissions 100000
+    python generate_data.py --db storage.db --seed 7      # append in place
+
+Rows are appended after the existing ids of each table, so the generator
+can run on top of the seed data. One of ``--db`` (append to an existing
+database) or ``--out`` (a new file started from the seed snapshot) is
+required, so the live storage.db is never filled by accident. Every value
+is drawn from one ``random.Random(--seed)``, so the same arguments produce
+the same database.
+
+submission_record rows are the bulk of the output: about one per question
+per submission (``--submissions`` x ``--questions-per-exam``). Submissions are
+graded with the same rules as the grading route.
+"""
+
+import argparse
+import datetime
+import itertools
+import logging
+import os
+import random
+import sqlite3
+import time
+from typing import Iterable, Sequence
+from exam_stats import REBUILD_STATEMENTS as QUESTION_STATS_REBUILD
+from leaderboard import rebuild_table as rebuild_leaderboard
+
+logger = logging.getLogger("generate_data")
+
+# Rows handed to one executemany call; everything runs in one transaction
+BATCH_SIZE = 50_000
+PASS_GRADE = 5.0
+START_DATE = datetime.datetime(2025, 1, 1)
+
+WORDS = (
+    "angle area axis chord circle coefficient cone cube curve degree diameter "
+    "equation exponent factor fraction function graph hypotenuse integer "
+    "interval limit line matrix mean median parabola perimeter polygon "
+    "polynomial prime probability radius ratio root sequence series slope "
+    "solution square sum tangent theorem triangle variable vector volume"
+).split()
+PROVINCES = ["Ha Noi", "Ho Chi Minh", "Da Nang", "Hai Phong", "Can Tho", "Hue"]
+
+
+class Generator:
+    def __init__(self, conn: sqlite3.Connection, seed: int):
+        self.conn = conn
+        self.rng = random.Random(seed)
+        self.counts = {}
+
+    def words(self, n: int) -> str:
+        return " ".join(self.rng.choices(WORDS, k=n))
+
+    def next_id(self, table: str) -> int:
+        return self.conn.execute(
+            f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}"
+        ).fetchone()[0]
+
+    def insert(self, table: str, columns: Sequence[str], rows: Iterable[tuple]):
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            self.conn.executemany(sql, batch)
+            self.counts[table] = self.counts.get(table, 0) + len(batch)
+
+    def users(self, n: int) -> range:
+        first = self.next_id("users")
+        ids = range(first, first + n)
+        self.insert(
+            "users",
+            ["id", "email", "full_name", "class", "school"],
+            (
+                (
+                    i,
+                    f"gen-user{i}@example.com",
+                    f"Student {i}",
+                    f"{self.rng.randint(6, 12)}A{self.rng.randint(1, 9)}",
+                    f"School {self.rng.randint(1, 500)}",
+                )
+                for i in ids
+            ),
+        )
+        return ids
+
+    def topics(self, n: int) -> range:
+        first = self.next_id("topics")
+        ids = range(first, first + n)
+        self.insert(
+            "topics",
+            ["id", "name", "description"],
+            ((i, f"Topic {i}: {self.words(2)}", self.words(12)) for i in ids),
+        )
+        return ids
+
+    def lessons(self, n: int, topic_ids: Sequence[int]) -> range:
+        first = self.next_id("lessons")
+        ids = range(first, first + n)
+        self.insert(
+            "lessons",
+            ["id", "topic_id", "title", "content", "short_describe"],
+            (
+                (
+                    i,
+                    self.rng.choice(topic_ids),
+                    self.words(4).title(),
+                    "\n\n".join(self.words(60) for _ in range(4)),
+                    self.words(12),
+                )
+                for i in ids
+            ),
+        )
+        return ids
+
+    def exams(self, n, topic_ids, questions_per_exam, answers_per_question):
+        """Insert exams with their questions and answers.
+
+        Returns ``{exam_id: [(question_id, type, [(answer_id, is_correct), ...])]}``
+        for answering and grading the generated submissions.
+        """
+        exam_first = self.next_id("exams")
+        question_id = self.next_id("questions")
+        answer_id = self.next_id("answers")
+        exam_ids = range(exam_first, exam_first + n)
+        exam_topics = {i: self.rng.choice(topic_ids) for i in exam_ids}
+        self.insert(
+            "exams",
+            ["id", "name", "year", "province", "topic_id", "rating"],
+            (
+                (
+                    i,
+                    f"Exam {i}",
+                    self.rng.randint(2015, 2025),
+                    self.rng.choice(PROVINCES),
+                    exam_topics[i],
+                    self.rng.randint(1, 5),
+                )
+                for i in exam_ids
+            ),
+        )
+        keys = {}
+        questions, answers = [], []
+        for exam_id in exam_ids:
+            keys[exam_id] = []
+            for _ in range(questions_per_exam):
+                kind = "multiple" if self.rng.random() < 0.25 else "single"
+                questions.append(
+                    (question_id, exam_id, exam_topics[exam_id], self.words(15), kind)
+                )
+                n_correct = 2 if kind == "multiple" else 1
+                correct = set(self.rng.sample(range(answers_per_question), n_correct))
+                choices = []
+                for k in range(answers_per_question):
+                    answers.append(
+                        (answer_id, question_id, self.words(3), k in correct)
+                    )
+                    choices.append((answer_id, k in correct))
+                    answer_id += 1
+                keys[exam_id].append((question_id, kind, choices))
+                question_id += 1
+        self.insert(
+            "questions", ["id", "exam_id", "topic_id", "content", "type"], questions
+        )
+        self.insert("answers", ["id", "question_id", "content", "is_correct"], answers)
+        return keys
+
+    def submissions(self, n: int, user_ids: Sequence[int], keys: dict):
+        submission_first = self.next_id("submissions")
+        record_id = self.next_id("submission_record")
+        exam_ids = list(keys)
+        attempts = {exam_id: [0, 0] for exam_id in exam_ids}
+        submissions = []
+        rng = self.rng
+
+        def records():
+            nonlocal record_id
+            for submission_id in range(submission_first, submission_first + n):
+                user_id = rng.choice(user_ids)
+                exam_id = rng.choice(exam_ids)
+                skill = rng.random()
+                correct = 0
+                for question_id, kind, choices in keys[exam_id]:
+                    if rng.random() < skill:
+                        picks = [a for a, is_correct in choices if is_correct]
+                        correct += 1
+                    else:
+                        # one wrong pick: incorrect for both question types
+                        picks = [rng.choice([a for a, ok in choices if not ok])]
+                    for answer_id in picks:
+                        yield (
+                            record_id,
+                            submission_id,
+                            user_id,
+                            question_id,
+                            answer_id,
+                        )
+                        record_id += 1
+                grade = round(10.0 * correct / len(keys[exam_id]), 2)
+                uploaded = START_DATE + datetime.timedelta(
+                    seconds=rng.randrange(365 * 24 * 3600)
+                )
+                submissions.append(
+                    (submission_id, user_id, exam_id, uploaded.isoformat(" "), grade)
+                )
+                attempts[exam_id][0] += 1
+                attempts[exam_id][1] += grade >= PASS_GRADE
+
+        self.insert(
+            "submission_record",
+            ["id", "submission_id", "user_id", "question_id", "chosen_answer_id"],
+            records(),
+        )
+        self.insert(
+            "submissions",
+            ["id", "user_id", "exam_id", "upload_time", "grade"],
+            submissions,
+        )
+        self.conn.executemany(
+            "UPDATE exams SET student_attempt = COALESCE(student_attempt, 0) + ?, "
+            "correct_attempt = COALESCE(correct_attempt, 0) + ? WHERE id = ?",
+            [(total, passed, exam_id) for exam_id, (total, passed) in attempts.items()],
+        )
+
+
+def generate(conn: sqlite3.Connection, args) -> dict:
+    gen = Generator(conn, args.seed)
+    # bulk load: durability of a half-written file does not matter
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    # submission_record references submissions, which are written after it
+    conn.execute("PRAGMA foreign_keys = OFF")
+    user_ids = list(gen.users(args.users))
+    topic_ids = list(gen.topics(args.topics))
+    gen.lessons(args.lessons, topic_ids)
+    keys = gen.exams(
+        args.exams, topic_ids, args.questions_per_exam, args.answers_per_question
+    )
+    gen.submissions(args.submissions, user_ids, keys)
+    # derived tables the API keeps up to date row by row
+    rebuild_leaderboard(conn.execute)
+    for statement in QUESTION_STATS_REBUILD:
+        conn.execute(statement)
+    conn.commit()
+    conn.execute("PRAGMA optimize")
+    return gen.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    # no default: appending to ./storage.db by accident is hard to undo
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", help="existing database to append to")
+    target.add_argument("--out", help="new database file, started from the seed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--lessons", type=int, default=500)
+    parser.add_argument("--exams", type=int, default=200)
+    parser.add_argument("--questions-per-exam", type=int, default=40)
+    parser.add_argument("--answers-per-question", type=int, default=4)
+    parser.add_argument("--submissions", type=int, default=50_000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    path = args.db
+    if args.out:
+        from snapshot import clone_template
+
+        if os.path.exists(args.out):
+            parser.error(f"{args.out} already exists")
+        path = clone_template(args.out)
+    conn = sqlite3.connect(path)
+    try:
+        start = time.perf_counter()
+        counts = generate(conn, args)
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+    total = sum(counts.values())
+    for table, count in counts.items():
+        logger.info(f"{table:<18} {count:>12,}")
+    logger.info(
+        f"{total:,} rows in {elapsed:.1f}s ({total / elapsed * 60:,.0f} rows/min) "
+        f"-> {path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
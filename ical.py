@@ -0,0 +1,136 @@
+"""Recurring schedule rules and iCalendar (RFC 5545) export.
+
+A recurring schedule item stores its first occurrence in ``schedule`` and a
+rule (``daily``/``weekly``/``monthly``, every ``interval`` periods, optionally
+``until`` a date) in ``schedule_recurrence``. Occurrences are never stored:
+``occurrences`` computes the ones inside a requested window, jumping straight
+to the window instead of walking from the first date.
+"""
+
+import datetime
+from typing import AsyncIterator, Iterator, List, Optional
+from sqlalchemy import Select
+from database import ReadSessionLocal
+from streaming import EXPORT_CHUNK_SIZE
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+PRODID = "-//Progresso//Schedule//EN"
+
+
+def _add_months(start: datetime.date, months: int) -> Optional[datetime.date]:
+    year, month = divmod(start.month - 1 + months, 12)
+    try:
+        return start.replace(year=start.year + year, month=month + 1)
+    except ValueError:
+        # e.g. the 31st in a 30-day month: RFC 5545 skips that occurrence
+        return None
+
+
+def occurrences(
+    start: datetime.date,
+    freq: str,
+    interval: int,
+    until: Optional[datetime.date],
+    window_start: datetime.date,
+    window_end: datetime.date,
+) -> Iterator[datetime.date]:
+    """Dates of a rule that fall within ``[window_start, window_end]``."""
+    last = min(window_end, until) if until else window_end
+    first = max(start, window_start)
+    if first > last:
+        return
+    if freq == "monthly":
+        n = ((first.year - start.year) * 12 + first.month - start.month) // interval
+        while True:
+            year, month = divmod(start.month - 1 + n * interval, 12)
+            if datetime.date(start.year + year, month + 1, 1) > last:
+                return
+            day = _add_months(start, n * interval)
+            if day is not None and day >= first:
+                yield day
+            n += 1
+    step = interval * (7 if freq == "weekly" else 1)
+    n = -(-(first - start).days // step)
+    day = start + datetime.timedelta(days=n * step)
+    while day <= last:
+        yield day
+        day += datetime.timedelta(days=step)
+
+
+def escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """Split a content line into 75-octet pieces joined by CRLF + space."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, size = [], 75
+    while data:
+        cut = min(size, len(data))
+        # never split a multi-byte UTF-8 sequence
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        size = 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def vevent(row, stamp: str) -> str:
+    """One VEVENT for a schedule row joined with its (optional) rule."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:schedule-{row.id}@progresso",
+        f"DTSTAMP:{stamp}",
+    ]
+    if row.start_time is not None:
+        start = datetime.datetime.combine(row.event_date, row.start_time)
+        lines.append(f"DTSTART:{start:%Y%m%dT%H%M%S}")
+    else:
+        lines.append(f"DTSTART;VALUE=DATE:{row.event_date:%Y%m%d}")
+    if row.freq:
+        rule = f"RRULE:FREQ={row.freq.upper()};INTERVAL={row.interval or 1}"
+        if row.until:
+            # UNTIL has the value type of DTSTART
+            rule += f";UNTIL={row.until:%Y%m%d}"
+            if row.start_time is not None:
+                rule += "T235959"
+        lines.append(rule)
+    lines.append(f"SUMMARY:{escape(row.title)}")
+    if row.description:
+        lines.append(f"DESCRIPTION:{escape(row.description)}")
+    if row.type:
+        lines.append(f"CATEGORIES:{escape(row.type)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+async def iter_calendar(
+    stmt: Select, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Stream a VCALENDAR for ``stmt``'s rows, ``chunk_size`` events at a time.
+
+    Like ``streaming.iter_ndjson`` it opens its own session, since the
+    request-scoped one is closed before the body is sent.
+    """
+    stamp = f"{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}"
+    header: List[str] = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+    ]
+    yield "".join(fold(line) for line in header).encode("utf-8")
+    async with ReadSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions(chunk_size):
+            yield "".join(vevent(row, stamp) for row in rows).encode("utf-8")
+    yield b"END:VCALENDAR\r\n"
@@ -0,0 +1,292 @@
+"""Exam, school and global leaderboards.
+
+A student's score on an exam is their best grade on it; their global (and
+school) score is the sum of those best grades. Best grades are persisted in
+``leaderboard_entries`` (migration 5) in the same transaction as the grade
+change, and mirrored in memory as sorted lists, so top-K and rank-of-user
+lookups are O(log n) and never scan ``submissions``.
+
+    python leaderboard.py --rebuild [path/to/db]
+
+recomputes ``leaderboard_entries`` from ``submissions`` in one pass, e.g.
+after grades were edited outside the API. A running server picks the result
+up with ``POST /api/v1/leaderboards/rebuild``, which does the same.
+"""
+
+import logging
+import sys
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sortedcontainers import SortedList
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("leaderboard")
+
+# SQLite caps the number of bound parameters per statement
+_CHUNK = 500
+
+REBUILD_STATEMENTS = [
+    "DELETE FROM leaderboard_entries",
+    "INSERT INTO leaderboard_entries (exam_id, user_id, best_grade) "
+    "SELECT exam_id, user_id, MAX(grade) FROM submissions "
+    "WHERE grade IS NOT NULL GROUP BY exam_id, user_id",
+]
+LOAD_SQL = (
+    "SELECT leaderboard_entries.exam_id, leaderboard_entries.user_id, "
+    "leaderboard_entries.best_grade, users.school FROM leaderboard_entries "
+    "JOIN users ON users.id = leaderboard_entries.user_id"
+)
+
+
+class Rank(NamedTuple):
+    rank: int
+    score: float
+    total: int
+
+
+class Board:
+    """Scores of one leaderboard, ordered best first.
+
+    Entries are ``(-score, user_id)``, so equal scores list by user id; ties
+    share a rank (1, 2, 2, 4).
+    """
+
+    def __init__(self, scores: Optional[Dict[int, float]] = None):
+        self.scores: Dict[int, float] = dict(scores or {})
+        self._order = SortedList((-score, uid) for uid, score in self.scores.items())
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def set(self, user_id: int, score: float):
+        self.remove(user_id)
+        self.scores[user_id] = score
+        self._order.add((-score, user_id))
+
+    def remove(self, user_id: int):
+        score = self.scores.pop(user_id, None)
+        if score is not None:
+            self._order.remove((-score, user_id))
+
+    def _rank_of(self, score: float) -> int:
+        return self._order.bisect_left((-score, -1)) + 1
+
+    def rank(self, user_id: int) -> Optional[Rank]:
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return Rank(self._rank_of(score), score, len(self._order))
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[int, int, float]]:
+        """``(rank, user_id, score)`` of the entries at ``offset``."""
+        entries = self._order.islice(offset, offset + limit)
+        return [(self._rank_of(-neg), uid, -neg) for neg, uid in entries]
+
+
+class Leaderboards:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.exams: Dict[int, Board] = {}
+        self.schools: Dict[str, Board] = {}
+        self.global_board = Board()
+        # user_id -> {exam_id: best grade}
+        self._best: Dict[int, Dict[int, float]] = {}
+        self._school: Dict[int, Optional[str]] = {}
+
+    def load(self, rows: Iterable[Tuple[int, int, float, Optional[str]]]):
+        """Replace all boards with ``(exam_id, user_id, best_grade, school)`` rows."""
+        self.clear()
+        per_exam: Dict[int, Dict[int, float]] = defaultdict(dict)
+        for exam_id, user_id, best, school in rows:
+            per_exam[exam_id][user_id] = best
+            self._best.setdefault(user_id, {})[exam_id] = best
+            self._school[user_id] = school
+        self.exams = {exam_id: Board(scores) for exam_id, scores in per_exam.items()}
+        totals = {uid: self._total(uid) for uid in self._best}
+        self.global_board = Board(totals)
+        per_school: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for uid, total in totals.items():
+            if self._school[uid]:
+                per_school[self._school[uid]][uid] = total
+        self.schools = {school: Board(scores) for school, scores in per_school.items()}
+
+    def _total(self, user_id: int) -> float:
+        return round(sum(self._best[user_id].values()), 2)
+
+    def _school_board(self, user_id: int) -> Optional[Board]:
+        school = self._school.get(user_id)
+        if not school:
+            return None
+        return self.schools.setdefault(school, Board())
+
+    def apply(self, updates: Iterable[Tuple[int, int, Optional[float], Optional[str]]]):
+        """Apply ``(exam_id, user_id, best_grade or None, school)`` changes."""
+        for exam_id, user_id, best, school in updates:
+            if user_id not in self._school:
+                self._school[user_id] = school
+            bests = self._best.setdefault(user_id, {})
+            board = self.exams.setdefault(exam_id, Board())
+            if best is None:
+                bests.pop(exam_id, None)
+                board.remove(user_id)
+            else:
+                bests[exam_id] = best
+                board.set(user_id, best)
+            school_board = self._school_board(user_id)
+            if bests:
+                total = self._total(user_id)
+                self.global_board.set(user_id, total)
+                if school_board is not None:
+                    school_board.set(user_id, total)
+            else:
+                del self._best[user_id]
+                self.global_board.remove(user_id)
+                if school_board is not None:
+                    school_board.remove(user_id)
+
+    def set_school(self, user_id: int, school: Optional[str]):
+        if self._school.get(user_id) == school or user_id not in self._best:
+            self._school[user_id] = school
+            return
+        old = self._school_board(user_id)
+        if old is not None:
+            old.remove(user_id)
+        self._school[user_id] = school
+        new = self._school_board(user_id)
+        if new is not None:
+            new.set(user_id, self._total(user_id))
+
+    def exam_ranks(self, user_id: int) -> List[Tuple[int, Rank]]:
+        return [
+            (exam_id, self.exams[exam_id].rank(user_id))
+            for exam_id in sorted(self._best.get(user_id, ()))
+        ]
+
+    def remove_user(self, user_id: int):
+        for exam_id in self._best.get(user_id, {}):
+            self.exams[exam_id].remove(user_id)
+        school_board = self._school_board(user_id)
+        if school_board is not None:
+            school_board.remove(user_id)
+        self.global_board.remove(user_id)
+        self._best.pop(user_id, None)
+        self._school.pop(user_id, None)
+
+    async def build(self, db: AsyncSession):
+        result = await db.execute(text(LOAD_SQL))
+        self.load(result.all())
+
+    async def rebuild(self, db: AsyncSession):
+        await db.run_sync(
+            lambda session: rebuild_table(session.connection().exec_driver_sql)
+        )
+        await db.commit()
+        await self.build(db)
+
+
+async def sync_best_grades(
+    db: AsyncSession, exam_id: int, user_ids: Optional[Iterable[int]] = None
+) -> List[Tuple[int, int, Optional[float], Optional[str]]]:
+    """Recompute best grades on ``exam_id`` and write them to
+    ``leaderboard_entries`` in the caller's transaction.
+
+    ``user_ids=None`` recomputes every student of the exam. Returns the
+    changes to hand to ``leaderboards.apply`` once the transaction commits.
+    """
+    if user_ids is None:
+        chunks = [None]
+    else:
+        user_ids = sorted(set(user_ids))
+        chunks = [user_ids[i : i + _CHUNK] for i in range(0, len(user_ids), _CHUNK)]
+    updates = []
+    for chunk in chunks:
+        params = {"exam_id": exam_id}
+        where = "submissions.exam_id = :exam_id"
+        if chunk is not None:
+            names = [f"u{i}" for i in range(len(chunk))]
+            params.update(zip(names, chunk))
+            where += (
+                f" AND submissions.user_id IN ({', '.join(':' + n for n in names)})"
+            )
+        result = await db.execute(
+            text(
+                "SELECT submissions.user_id, MAX(submissions.grade), users.school "
+                "FROM submissions JOIN users ON users.id = submissions.user_id "
+                f"WHERE {where} GROUP BY submissions.user_id"
+            ),
+            params,
+        )
+        rows = result.all()
+        found = {user_id for user_id, _, _ in rows}
+        updates.extend((exam_id, uid, best, school) for uid, best, school in rows)
+        if chunk is not None:
+            updates.extend(
+                (exam_id, uid, None, None) for uid in chunk if uid not in found
+            )
+    graded = [
+        {"exam_id": exam_id, "user_id": uid, "best": best}
+        for _, uid, best, _ in updates
+        if best is not None
+    ]
+    ungraded = [
+        {"exam_id": exam_id, "user_id": uid}
+        for _, uid, best, _ in updates
+        if best is None
+    ]
+    if user_ids is None:
+        await db.execute(
+            text("DELETE FROM leaderboard_entries WHERE exam_id = :exam_id"),
+            {"exam_id": exam_id},
+        )
+    elif ungraded:
+        await db.execute(
+            text(
+                "DELETE FROM leaderboard_entries "
+                "WHERE exam_id = :exam_id AND user_id = :user_id"
+            ),
+            ungraded,
+        )
+    if graded:
+        await db.execute(
+            text(
+                "INSERT INTO leaderboard_entries (exam_id, user_id, best_grade) "
+                "VALUES (:exam_id, :user_id, :best) "
+                "ON CONFLICT (exam_id, user_id) DO UPDATE SET best_grade = :best"
+            ),
+            graded,
+        )
+    return updates
+
+
+def rebuild_table(execute: Callable):
+    """Recompute ``leaderboard_entries`` from ``submissions``; the caller commits."""
+    for statement in REBUILD_STATEMENTS:
+        execute(statement)
+
+
+leaderboards = Leaderboards()
+
+
+if __name__ == "__main__":
+    import sqlite3
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+    if "--rebuild" not in sys.argv:
+        sys.exit(__doc__)
+    args = [arg for arg in sys.argv[1:] if arg != "--rebuild"]
+    conn = sqlite3.connect(args[0] if args else "storage.db")
+    try:
+        start = time.perf_counter()
+        rebuild_table(conn.execute)
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM leaderboard_entries").fetchone()[0]
+        logger.info(
+            f"Rebuilt {count:,} leaderboard entries in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+    finally:
+        conn.close()
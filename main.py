@@ -1,23 +1,33 @@
 import os
-from typing import Literal
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from database import Base, engine
+from database import Base, ReadSessionLocal, engine, read_engine
+from metrics import MetricsMiddleware, instrument_engine
+from migrations import apply_migrations
+from reply_cache import ReplyCache
+from slow_queries import SLOW_QUERY_LOG, slow_query_log
+from retrieval import retrieval_index
+from leaderboard import leaderboards
 
 from Routes import (
+    DashboardRoute,
+    DebugRoute,
     ExamRoute,
     GeminiAIRoute,
+    GradingRoute,
+    LeaderboardRoute,
     LessonCompletedRoute,
     QuestionandAnswerRoute,
     QuizletRoute,
     Reset_DBRoute,
     ScheduleRoute,
+    SearchRoute,
     SubmissionRecordRoute,
     SubmissionRoute,
     TopicRoute,
     UserRoute,
     LessionRoute,
+    MetricsRoute,
 )
 import logging
 from contextlib import asynccontextmanager
@@ -37,14 +47,27 @@ app = FastAPI(
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(QuestionandAnswerRoute.Base.metadata.create_all)
+        version = await conn.run_sync(
+            lambda sync_conn: apply_migrations(sync_conn.exec_driver_sql)
+        )
+        logger.info(f"Database schema at version {version}")
+    async with ReadSessionLocal() as session:
+        await retrieval_index.build(session)
+        await leaderboards.build(session)
+    logger.info(f"Retrieval index holds {len(retrieval_index)} passages")
+    logger.info(f"Leaderboards rank {len(leaderboards.global_board)} students")
 
 
 # Lifespan event handler
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    app.state.gemini = GeminiAIRoute.GeminiClient()
+    app.state.gemini_cache = ReplyCache()
     yield
-    # Add any cleanup code here if needed
+    await app.state.gemini.aclose()
+    app.state.gemini_cache.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -57,18 +80,23 @@ app.add_middleware(
     allow_headers=["*"],
     allow_credentials=False,
 )
+app.add_middleware(MetricsMiddleware)
 
-
-class FilterParams(BaseModel):
-    limit: int = Field(100, gt=0, le=100)
-    offset: int = Field(0, ge=0)
-    order_by: Literal["created_at", "updated_at"] = "created_at"
-    tags: list[str] = []
+instrument_engine(engine, "write")
+if read_engine is not engine:
+    instrument_engine(read_engine, "read")
+if SLOW_QUERY_LOG:
+    slow_query_log.instrument(engine, "write")
+    if read_engine is not engine:
+        slow_query_log.instrument(read_engine, "read")
 
 
+app.include_router(MetricsRoute.router, tags=["metrics"])
+app.include_router(DebugRoute.router, tags=["debug"])
 app.include_router(Reset_DBRoute.router, prefix="/api/v1", tags=["reset-db"])
 app.include_router(GeminiAIRoute.router, prefix="/api/v1", tags=["progressoAI-chat"])
 app.include_router(UserRoute.router, prefix="/api/v1", tags=["users"])
+app.include_router(DashboardRoute.router, prefix="/api/v1", tags=["users"])
 app.include_router(ExamRoute.router, prefix="/api/v1", tags=["exams"])
 app.include_router(
     QuestionandAnswerRoute.router, prefix="/api/v1", tags=["questions-answers"]
@@ -77,10 +105,13 @@ app.include_router(SubmissionRoute.router, prefix="/api/v1", tags=["submissions"
 app.include_router(
     SubmissionRecordRoute.router, prefix="/api/v1", tags=["submission-records"]
 )
+app.include_router(GradingRoute.router, prefix="/api/v1", tags=["grading"])
+app.include_router(LeaderboardRoute.router, prefix="/api/v1", tags=["leaderboards"])
 app.include_router(QuizletRoute.router, prefix="/api/v1", tags=["quizlet"])
 app.include_router(ScheduleRoute.router, prefix="/api/v1", tags=["schedules"])
 app.include_router(LessionRoute.router, prefix="/api/v1", tags=["lessons"])
 app.include_router(TopicRoute.router, prefix="/api/v1", tags=["topics"])
+app.include_router(SearchRoute.router, prefix="/api/v1", tags=["search"])
 app.include_router(
     LessonCompletedRoute.router, prefix="/api/v1", tags=["lessons-completed"]
 )
@@ -0,0 +1,150 @@
+"""Prometheus metrics: HTTP latency and status per route, DB cost per request.
+
+``MetricsMiddleware`` times every request and opens a per-request DB
+tally in a context variable; ``instrument_engine`` hooks the cursor events
+of an engine so each statement run on behalf of that request is counted
+and timed. Requests issuing more than ``DB_QUERY_WARN_THRESHOLD`` queries
+are logged, which is how N+1 loops show up.
+"""
+
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+
+logger = logging.getLogger("metrics")
+
+DB_QUERY_WARN_THRESHOLD = int(os.getenv("DB_QUERY_WARN_THRESHOLD", "25"))
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve an HTTP request, including streaming the body",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ["method"]
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving one request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250),
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent executing SQL while serving one request",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+DB_STATEMENTS = Counter(
+    "db_statements_total", "SQL statements executed, per engine", ["engine"]
+)
+
+
+class RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_request_db: ContextVar[Optional[RequestDbStats]] = ContextVar(
+    "request_db", default=None
+)
+_request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def current_db_stats() -> Optional[RequestDbStats]:
+    return _request_db.get()
+
+
+def current_route() -> Optional[str]:
+    """``"METHOD /route/{template}"`` of the request being served, if any."""
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    return f"{scope['method']} {route_label(scope)}"
+
+
+def instrument_engine(engine, name: str):
+    """Count and time every statement ``engine`` runs, per request."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_STATEMENTS.labels(name).inc()
+        stats = _request_db.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # a failed statement never reaches after_cursor_execute
+        if exception_context.connection is not None:
+            starts = exception_context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+
+def route_label(scope) -> str:
+    # the route template, so /users/1 and /users/2 share one series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed bodies are included in the timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        stats = RequestDbStats()
+        token = _request_db.set(stats)
+        scope_token = _request_scope.set(scope)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            _request_db.reset(token)
+            _request_scope.reset(scope_token)
+            route = route_label(scope)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            DB_QUERIES.labels(method, route).observe(stats.queries)
+            DB_TIME.labels(method, route).observe(stats.seconds)
+            if stats.queries > DB_QUERY_WARN_THRESHOLD:
+                logger.warning(
+                    f"{method} {route} ran {stats.queries} queries "
+                    f"({stats.seconds * 1000:.1f} ms of DB time)"
+                )
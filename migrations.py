@@ -0,0 +1,211 @@
+"""Versioned schema migrations for storage.db.
+
+``create_all`` only creates missing tables, so anything added to an existing
+database (indexes, new columns) goes here. The applied version is kept in
+SQLite's ``PRAGMA user_version``; migrations run in order at startup and
+after /reset-db.
+
+Run ``python migrations.py path/to/db`` to migrate a database by hand.
+tests/test_query_plans.py checks that every route lookup is served by one of
+the indexes created here.
+"""
+
+import logging
+import sys
+from typing import Callable, List, Tuple, Union
+from exam_stats import ATTEMPTS_REBUILD
+from exam_stats import REBUILD_STATEMENTS as QUESTION_STATS_REBUILD
+from leaderboard import rebuild_table as rebuild_leaderboard
+
+logger = logging.getLogger("migrations")
+
+
+def fts_statements(table: str, columns: List[str]) -> List[str]:
+    """External-content FTS5 mirror of ``table`` plus its sync triggers."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete = (
+        f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    )
+    insert = f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, "
+        f"content='{table}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} "
+        f"BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} "
+        f"BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} "
+        f"BEGIN {delete} {insert} END",
+        # index the rows that existed before the triggers (or after /reset-db
+        # recreated the base table underneath the FTS table)
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+# A step is one SQL string, or a function called with ``execute``
+Step = Union[str, Callable[[Callable], None]]
+
+# (version, description, steps)
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (
+        1,
+        "unique submission_record choice",
+        [
+            # drop exact duplicate choices left by the old batch route
+            "DELETE FROM submission_record WHERE id NOT IN ("
+            "SELECT MIN(id) FROM submission_record "
+            "GROUP BY submission_id, question_id, chosen_answer_id)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_submission_record_choice "
+            "ON submission_record (submission_id, question_id, chosen_answer_id)",
+        ],
+    ),
+    (
+        2,
+        "foreign key lookup indexes",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_submissions_user_id "
+            "ON submissions (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_submissions_exam_id "
+            "ON submissions (exam_id)",
+            "CREATE INDEX IF NOT EXISTS ix_submission_record_submission_user "
+            "ON submission_record (submission_id, user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_questions_exam_id ON questions (exam_id)",
+            "CREATE INDEX IF NOT EXISTS ix_answers_question_id "
+            "ON answers (question_id)",
+            "CREATE INDEX IF NOT EXISTS ix_quizlet_lesson_id ON quizlet (lesson_id)",
+            "CREATE INDEX IF NOT EXISTS ix_lessons_topic_id ON lessons (topic_id)",
+            "CREATE INDEX IF NOT EXISTS ix_schedule_user_event_date "
+            "ON schedule (user_id, event_date)",
+            "CREATE INDEX IF NOT EXISTS ix_lessons_completed_user_id "
+            "ON lessons_completed (user_id)",
+        ],
+    ),
+    (
+        3,
+        "full-text search tables",
+        fts_statements("lessons", ["title", "short_describe", "content"])
+        + fts_statements("questions", ["content"])
+        + fts_statements("quizlet", ["question", "answer"]),
+    ),
+    (
+        4,
+        "covering indexes for the user dashboard",
+        [
+            # recent submissions are read straight from the index, newest first
+            "CREATE INDEX IF NOT EXISTS ix_submissions_user_recent "
+            "ON submissions (user_id, upload_time, exam_id, grade)",
+            "DROP INDEX IF EXISTS ix_submissions_user_id",
+            "CREATE INDEX IF NOT EXISTS ix_lessons_completed_user_lesson "
+            "ON lessons_completed (user_id, lesson_id)",
+            "DROP INDEX IF EXISTS ix_lessons_completed_user_id",
+        ],
+    ),
+    (
+        5,
+        "leaderboard best grades",
+        [
+            "CREATE TABLE IF NOT EXISTS leaderboard_entries ("
+            "exam_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+            "best_grade REAL NOT NULL, PRIMARY KEY (exam_id, user_id)"
+            ") WITHOUT ROWID",
+            "CREATE INDEX IF NOT EXISTS ix_leaderboard_entries_user_id "
+            "ON leaderboard_entries (user_id)",
+            rebuild_leaderboard,
+        ],
+    ),
+    (
+        6,
+        "question difficulty statistics and exam attempt counters",
+        [
+            "CREATE TABLE IF NOT EXISTS question_stats ("
+            "question_id INTEGER PRIMARY KEY, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "correct INTEGER NOT NULL DEFAULT 0)",
+            "CREATE TABLE IF NOT EXISTS answer_stats ("
+            "answer_id INTEGER PRIMARY KEY, picks INTEGER NOT NULL DEFAULT 0)",
+            # the seeded counters do not match the submissions; every later
+            # change is applied on top of them
+            ATTEMPTS_REBUILD,
+        ]
+        + QUESTION_STATS_REBUILD,
+    ),
+    (
+        7,
+        "unique lesson completions and topic progress rollup",
+        [
+            "DELETE FROM lessons_completed WHERE id NOT IN ("
+            "SELECT MIN(id) FROM lessons_completed GROUP BY user_id, lesson_id)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_lessons_completed_user_lesson "
+            "ON lessons_completed (user_id, lesson_id)",
+            "DROP INDEX IF EXISTS ix_lessons_completed_user_lesson",
+            "CREATE TABLE IF NOT EXISTS topic_progress ("
+            "user_id INTEGER NOT NULL, topic_id INTEGER NOT NULL, "
+            "completed INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (user_id, topic_id)"
+            ") WITHOUT ROWID",
+            "INSERT OR REPLACE INTO topic_progress (user_id, topic_id, completed) "
+            "SELECT lessons_completed.user_id, lessons.topic_id, COUNT(*) "
+            "FROM lessons_completed "
+            "JOIN lessons ON lessons.id = lessons_completed.lesson_id "
+            "GROUP BY lessons_completed.user_id, lessons.topic_id",
+        ],
+    ),
+    (
+        8,
+        "schedule date-range index and recurrence rules",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_schedule_user_date_time "
+            "ON schedule (user_id, event_date, start_time)",
+            "DROP INDEX IF EXISTS ix_schedule_user_event_date",
+            "CREATE TABLE IF NOT EXISTS schedule_recurrence ("
+            "schedule_id INTEGER NOT NULL PRIMARY KEY REFERENCES schedule (id), "
+            "user_id INTEGER NOT NULL, freq VARCHAR NOT NULL, "
+            "interval INTEGER NOT NULL, until DATE)",
+            "CREATE INDEX IF NOT EXISTS ix_schedule_recurrence_user_id "
+            "ON schedule_recurrence (user_id)",
+        ],
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def apply_migrations(execute: Callable) -> int:
+    """Apply pending migrations and return the resulting schema version.
+
+    ``execute`` runs one SQL string and returns a cursor-like result, e.g.
+    ``sqlite3.Connection.execute`` or SQLAlchemy's
+    ``Connection.exec_driver_sql``. The caller owns the transaction.
+    """
+    current = execute("PRAGMA user_version").fetchone()[0]
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        for step in steps:
+            if callable(step):
+                step(execute)
+            else:
+                execute(step)
+        execute(f"PRAGMA user_version = {version}")
+        current = version
+    return current
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        # no default: migrating ./storage.db in place by accident is hard to undo
+        sys.exit("usage: python migrations.py path/to/db")
+    conn = sqlite3.connect(sys.argv[1])
+    try:
+        version = apply_migrations(conn.execute)
+        conn.commit()
+        print(f"schema version {version}")
+    finally:
+        conn.close()
@@ -0,0 +1,88 @@
+import base64
+import json
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+MAX_PAGE_SIZE = 100
+
+
+class PageParams(BaseModel):
+    """Query parameters shared by every list endpoint.
+
+    Use as ``page: Annotated[PageParams, Query()]``.
+    """
+
+    limit: int = Field(MAX_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = None
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset(stmt: Select, page: PageParams, keys: Sequence[Any]) -> Select:
+    """Apply keyset ordering, the cursor predicate and ``limit + 1`` to ``stmt``.
+
+    ``keys`` are the columns that define a stable, unique order; the last
+    one should be the primary key.
+    """
+    if page.cursor:
+        values = decode_cursor(page.cursor, len(keys))
+        if len(keys) == 1:
+            stmt = stmt.where(keys[0] > values[0])
+        else:
+            stmt = stmt.where(tuple_(*keys) > tuple_(*values))
+    return stmt.order_by(*keys).limit(page.limit + 1)
+
+
+def next_page(
+    items: Sequence[Any], page: PageParams, keys: Sequence[Any]
+) -> Tuple[list, Optional[str]]:
+    """Trim the extra lookahead row and build the cursor for the next page."""
+    items = list(items)
+    if len(items) <= page.limit:
+        return items, None
+    items = items[: page.limit]
+    last = items[-1]
+    return items, encode_cursor([getattr(last, key.key) for key in keys])
+
+
+async def paginate(
+    db: AsyncSession, stmt: Select, page: PageParams, keys: Sequence[Any]
+) -> Tuple[list, Optional[str]]:
+    """Run an entity select as one keyset page: ``(items, next_cursor)``."""
+    result = await db.execute(keyset(stmt, page, keys))
+    return next_page(result.scalars().all(), page, keys)
+
+
+async def paginate_rows(
+    db: AsyncSession, stmt: Select, page: PageParams, keys: Sequence[Any]
+) -> Tuple[list, Optional[str]]:
+    """Like ``paginate`` for column selects: returns ``Row`` tuples.
+
+    Each key must be selected under its own attribute name.
+    """
+    result = await db.execute(keyset(stmt, page, keys))
+    return next_page(result.all(), page, keys)
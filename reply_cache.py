@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+REPLY_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "2048"))
+REPLY_CACHE_TTL = float(os.getenv("GEMINI_CACHE_TTL", "3600"))
+# Optional persistent tier; unset keeps the cache in memory only
+REPLY_CACHE_DB = os.getenv("GEMINI_CACHE_DB")
+
+
+def normalize_prompt(message: str) -> str:
+    return " ".join(message.split()).casefold()
+
+
+def cache_key(model: str, message: str) -> str:
+    raw = f"{model}\n{normalize_prompt(message)}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class ReplyCache:
+    """Content-addressed cache of AI replies with single-flight misses.
+
+    Entries live in an in-memory LRU with a TTL, optionally backed by a
+    SQLite file that survives restarts. Concurrent lookups of the same key
+    share one upstream call.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = REPLY_CACHE_MAX_ENTRIES,
+        ttl: float = REPLY_CACHE_TTL,
+        db_path: Optional[str] = REPLY_CACHE_DB,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reply_cache ("
+                "key TEXT PRIMARY KEY, reply TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.persistent_hits + self.misses + self.coalesced
+        served = self.hits + self.persistent_hits + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+        }
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, reply = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return reply
+
+    def _put_memory(self, key: str, reply: str, expires_at: float):
+        self._entries[key] = (expires_at, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_persistent(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT expires_at, reply FROM reply_cache "
+                "WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+
+    def _put_persistent(self, key: str, reply: str, expires_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO reply_cache (key, reply, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, reply, expires_at),
+            )
+            self._db.commit()
+
+    def peek(self, key: str) -> Optional[str]:
+        """Return a fresh in-memory reply or None, counting the lookup."""
+        reply = self._get_memory(key)
+        if reply is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return reply
+
+    def store(self, key: str, reply: str):
+        """Cache a reply produced outside ``get_or_fetch`` (e.g. streamed)."""
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, reply, expires_at)
+        if self._db is not None:
+            self._put_persistent(key, reply, expires_at)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        reply = self._get_memory(key)
+        if reply is not None:
+            self.hits += 1
+            return reply
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # the leader's request was cancelled, not ours: fetch again,
+                # the first waiter to get here becoming the new leader
+                return await self.get_or_fetch(key, fetch)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            row = None
+            if self._db is not None:
+                row = await asyncio.to_thread(self._get_persistent, key)
+            if row is not None:
+                self.persistent_hits += 1
+                expires_at, reply = row
+                self._put_memory(key, reply, expires_at)
+            else:
+                self.misses += 1
+                reply = await fetch()
+                expires_at = time.time() + self.ttl
+                self._put_memory(key, reply, expires_at)
+                if self._db is not None:
+                    await asyncio.to_thread(
+                        self._put_persistent, key, reply, expires_at
+                    )
+            future.set_result(reply)
+            return reply
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark retrieved so a failure nobody waited for is not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
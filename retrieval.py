@@ -0,0 +1,230 @@
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+# Rough prompt budget for attached passages, in tokens (~4 characters each)
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", "800"))
+# Lesson bodies are split into passages of about this many words
+PASSAGE_WORDS = 120
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _clean(text: Optional[str]) -> str:
+    # seeded lesson bodies store markdown newlines as a literal backslash-n
+    return (text or "").replace("\\n", "\n").strip()
+
+
+def split_passages(text: str, max_words: int = PASSAGE_WORDS) -> List[str]:
+    """Group paragraphs into passages of at most ``max_words`` words."""
+    passages, current, words = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        n = len(paragraph.split())
+        if current and words + n > max_words:
+            passages.append("\n\n".join(current))
+            current, words = [], 0
+        current.append(paragraph)
+        words += n
+    if current:
+        passages.append("\n\n".join(current))
+    return passages
+
+
+class LessonDoc(NamedTuple):
+    id: int
+    title: str
+    content: Optional[str]
+    short_describe: Optional[str]
+
+
+class QuizletDoc(NamedTuple):
+    id: int
+    question: str
+    answer: str
+
+
+class Passage(NamedTuple):
+    kind: str
+    source_id: int
+    title: str
+    text: str
+    score: float
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring; documents can be replaced."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[object, int]] = defaultdict(dict)
+        self._lengths: Dict[object, int] = {}
+        self._terms: Dict[object, List[str]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id, text: str):
+        self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings[term][doc_id] = tf
+        length = sum(counts.values())
+        self._lengths[doc_id] = length
+        self._terms[doc_id] = list(counts)
+        self._total_length += length
+
+    def remove(self, doc_id):
+        terms = self._terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def search(self, query: str, k: int) -> List[Tuple[object, float]]:
+        n = len(self._lengths)
+        if not n:
+            return []
+        avg_length = self._total_length / n
+        scores: Dict[object, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (
+                    1 - self.b + self.b * self._lengths[doc_id] / avg_length
+                )
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class RetrievalIndex:
+    """BM25 passages over lessons and quizlet cards, kept in sync by the routes.
+
+    Built once in ``main.lifespan``; the lesson and quizlet handlers call
+    ``index_*``/``remove_*`` after each successful commit.
+    """
+
+    def __init__(self):
+        self.bm25 = BM25Index()
+        # (kind, source_id) -> passage doc ids, for replacement and removal
+        self._sources: Dict[Tuple[str, int], List[tuple]] = {}
+        self._passages: Dict[tuple, Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.bm25)
+
+    def _remove(self, kind: str, source_id: int):
+        for doc_id in self._sources.pop((kind, source_id), []):
+            self.bm25.remove(doc_id)
+            del self._passages[doc_id]
+
+    def _add(self, kind: str, source_id: int, title: str, texts: List[str]):
+        self._remove(kind, source_id)
+        doc_ids = []
+        for n, text in enumerate(texts):
+            doc_id = (kind, source_id, n)
+            # the title is indexed with every passage but returned only once
+            self.bm25.add(doc_id, f"{title}\n{text}")
+            self._passages[doc_id] = (title, text)
+            doc_ids.append(doc_id)
+        self._sources[(kind, source_id)] = doc_ids
+
+    def index_lesson(self, lesson):
+        title = lesson.title or ""
+        texts = split_passages(_clean(lesson.content))
+        describe = _clean(lesson.short_describe)
+        if describe:
+            texts.insert(0, describe)
+        self._add("lesson", lesson.id, title, texts)
+
+    def remove_lesson(self, lesson_id: int):
+        self._remove("lesson", lesson_id)
+
+    def index_quizlet(self, item):
+        text = f"Q: {_clean(item.question)}\nA: {_clean(item.answer)}"
+        self._add("quizlet", item.id, "Flashcard", [text])
+
+    def remove_quizlet(self, quizlet_id: int):
+        self._remove("quizlet", quizlet_id)
+
+    def rebuild(self, lessons, quizlets):
+        self.bm25 = BM25Index()
+        self._sources.clear()
+        self._passages.clear()
+        for lesson in lessons:
+            self.index_lesson(lesson)
+        for item in quizlets:
+            self.index_quizlet(item)
+
+    async def build(self, db: AsyncSession):
+        # imported here: the route modules import this one
+        from Routes.LessionRoute import LessonORM
+        from Routes.QuizletRoute import QuizletORM
+
+        lessons = await db.execute(
+            select(*(getattr(LessonORM, key) for key in LessonDoc._fields))
+        )
+        quizlets = await db.execute(
+            select(*(getattr(QuizletORM, key) for key in QuizletDoc._fields))
+        )
+        self.rebuild(lessons.all(), quizlets.all())
+
+    def search(self, query: str, k: int = RAG_TOP_K) -> List[Passage]:
+        passages = []
+        for doc_id, score in self.bm25.search(query, k):
+            title, text = self._passages[doc_id]
+            passages.append(Passage(doc_id[0], doc_id[1], title, text, score))
+        return passages
+
+    def context(
+        self, query: str, k: int = RAG_TOP_K, token_budget: int = RAG_TOKEN_BUDGET
+    ) -> List[Passage]:
+        """Top-``k`` passages, best first, that fit within ``token_budget``."""
+        chosen, used = [], 0
+        for passage in self.search(query, k):
+            cost = estimate_tokens(passage.title) + estimate_tokens(passage.text)
+            if used + cost > token_budget:
+                continue
+            chosen.append(passage)
+            used += cost
+        return chosen
+
+
+def grounded_prompt(message: str, passages: List[Passage]) -> str:
+    if not passages:
+        return message
+    blocks = [f"[{p.title}]\n{p.text}" for p in passages]
+    return (
+        "Answer the student's question. Use the course material below "
+        "when it is relevant.\n\n" + "\n\n".join(blocks) + f"\n\nQuestion: {message}"
+    )
+
+
+retrieval_index = RetrievalIndex()
@@ -0,0 +1,131 @@
+"""Opt-in slow-query log with captured query plans.
+
+Enabled with ``SLOW_QUERY_LOG=1``. Statements slower than
+``SLOW_QUERY_MS`` are kept, with probability ``SLOW_QUERY_SAMPLE_RATE``,
+in a ring buffer of the last ``SLOW_QUERY_BUFFER`` entries, together with
+the route that issued them, the shape (not the values) of their parameters
+and their ``EXPLAIN QUERY PLAN``. Plans are cached per statement text, so
+a slow query that repeats is explained once.
+"""
+
+import datetime
+import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from typing import List
+from sqlalchemy import event
+from metrics import current_route
+
+logger = logging.getLogger("slow_queries")
+
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+PLAN_CACHE_SIZE = 256
+
+
+def parameter_shape(parameters, many: bool) -> str:
+    """Describe bound parameters by type only, e.g. ``3 x (int, str)``."""
+
+    def one(params) -> str:
+        if isinstance(params, dict):
+            items = ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items())
+            return f"{{{items}}}"
+        if isinstance(params, (list, tuple)):
+            return f"({', '.join(type(v).__name__ for v in params)})"
+        return type(params).__name__
+
+    if many:
+        return f"{len(parameters)} x {one(parameters[0]) if parameters else '()'}"
+    return one(parameters)
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        sample_rate: float = SLOW_QUERY_SAMPLE_RATE,
+        size: int = SLOW_QUERY_BUFFER,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.entries: deque = deque(maxlen=size)
+        self._plans: "OrderedDict[str, List[str]]" = OrderedDict()
+        self.seen = 0
+
+    def instrument(self, engine, name: str):
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+            conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+            elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+            if elapsed < self.threshold:
+                return
+            self.seen += 1
+            if random.random() >= self.sample_rate:
+                return
+            self.record(conn, name, statement, parameters, many, elapsed)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def handle_error(exception_context):
+            if exception_context.connection is not None:
+                starts = exception_context.connection.info.get("slow_query_start")
+                if starts:
+                    starts.pop()
+
+    def _plan(self, conn, statement: str, parameters, many: bool) -> List[str]:
+        plan = self._plans.get(statement)
+        if plan is not None:
+            self._plans.move_to_end(statement)
+            return plan
+        if many:
+            parameters = parameters[0] if parameters else ()
+        # a fresh DBAPI cursor: the statement's own cursor still holds its rows
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plan = [row[-1] for row in cursor.fetchall()]
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        finally:
+            cursor.close()
+        self._plans[statement] = plan
+        while len(self._plans) > PLAN_CACHE_SIZE:
+            self._plans.popitem(last=False)
+        return plan
+
+    def record(self, conn, engine_name, statement, parameters, many, elapsed):
+        entry = {
+            "at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "engine": engine_name,
+            "route": current_route(),
+            "statement": statement,
+            "parameters": parameter_shape(parameters, many),
+            "plan": self._plan(conn, statement, parameters, many),
+        }
+        self.entries.append(entry)
+        logger.warning(
+            f"Slow query ({entry['duration_ms']} ms) from {entry['route']}: "
+            f"{' '.join(statement.split())[:200]}"
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": SLOW_QUERY_LOG,
+            "threshold_ms": self.threshold * 1000,
+            "sample_rate": self.sample_rate,
+            "slow_seen": self.seen,
+            # newest first
+            "entries": list(reversed(self.entries)),
+        }
+
+
+slow_query_log = SlowQueryLog()
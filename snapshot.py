@@ -0,0 +1,120 @@
+"""Seed snapshot: progresso_data.sql compiled once into a template database.
+
+Resetting copies the template over the live database with SQLite's online
+backup API instead of re-running the seed script. The template is rebuilt
+automatically whenever the seed script or the migrations change.
+
+    python snapshot.py                 # build (or reuse) the template
+    python snapshot.py --clone x.db    # fresh seeded copy, e.g. for a test
+
+Tests that need isolation can ``clone_template()`` into a temp file and
+point DATABASE_URL at it, or call ``reset_database()`` between tests.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+from typing import Optional
+from database import engine, read_engine
+from migrations import MIGRATIONS, apply_migrations
+
+logger = logging.getLogger("snapshot")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SEED_SQL_PATH = os.path.join(ROOT, "progresso_data.sql")
+SEED_TEMPLATE_DIR = os.getenv("SEED_TEMPLATE_DIR", tempfile.gettempdir())
+
+
+def _fingerprint() -> str:
+    digest = hashlib.sha256()
+    with open(SEED_SQL_PATH, "rb") as f:
+        digest.update(f.read())
+    for version, description, steps in MIGRATIONS:
+        digest.update(f"{version} {description}".encode("utf-8"))
+        for step in steps:
+            if callable(step):
+                # a function's repr holds its address; hash its module instead
+                step = inspect.getsource(inspect.getmodule(step))
+            digest.update(step.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def template_path() -> str:
+    return os.path.join(SEED_TEMPLATE_DIR, f"progresso-seed-{_fingerprint()}.db")
+
+
+def build_template() -> str:
+    """Return the template for the current seed, compiling it if missing."""
+    path = template_path()
+    if os.path.exists(path):
+        return path
+    with open(SEED_SQL_PATH, "r", encoding="utf-8") as f:
+        sql_script = f.read()
+    # build beside the target and rename, so readers never see a partial file
+    fd, partial = tempfile.mkstemp(dir=SEED_TEMPLATE_DIR, suffix=".partial")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(partial)
+        try:
+            conn.executescript(sql_script)
+            apply_migrations(conn.execute)
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    logger.info(f"Compiled seed template {path}")
+    return path
+
+
+def clone_template(dest_path: str) -> str:
+    """Overwrite ``dest_path`` with the seeded template and return it."""
+    source = sqlite3.connect(build_template())
+    try:
+        dest = sqlite3.connect(dest_path)
+        try:
+            source.backup(dest)
+        finally:
+            dest.close()
+    finally:
+        source.close()
+    return dest_path
+
+
+def database_path() -> Optional[str]:
+    """File behind the app's engine, or None for an in-memory database."""
+    path = engine.url.database
+    return None if path in (None, "", ":memory:") else path
+
+
+async def reset_database():
+    """Restore the app's database from the template.
+
+    Both pools are disposed first so no pooled connection keeps a cached
+    schema or an open read snapshot of the old contents; they reconnect
+    lazily afterwards.
+    """
+    path = database_path()
+    if path is None:
+        raise RuntimeError("Cannot reset an in-memory database from the snapshot")
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await asyncio.to_thread(clone_template, path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    if "--clone" in args:
+        print(clone_template(args[args.index("--clone") + 1]))
+    else:
+        print(build_template())
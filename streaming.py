@@ -0,0 +1,40 @@
+import datetime
+import json
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from database import ReadSessionLocal
+
+# Rows fetched from SQLite and written to the client per chunk.
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def iter_ndjson(stmt: Select, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield the rows of a column select as NDJSON, one chunk of lines at a time.
+
+    The generator owns its session: the request-scoped one from ``get_read_db``
+    is already closed by the time the response body is streamed.
+    """
+    async with ReadSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+        keys = list(result.keys())
+        async for rows in result.partitions(chunk_size):
+            lines = [
+                json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=_default)
+                for row in rows
+            ]
+            lines.append("")
+            yield "\n".join(lines).encode("utf-8")
+
+
+def ndjson_response(stmt: Select, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_ndjson(stmt),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,165 @@
+"""Every route lookup is served by an index, checked with EXPLAIN QUERY PLAN.
+
+The statements are the ones the routes execute, compiled for SQLite against
+a scratch database built from progresso_data.sql plus the migrations.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import date
+
+import pytest
+from sqlalchemy import Select, create_engine
+from sqlalchemy.dialects import sqlite
+
+import main  # noqa: F401  registers every model on Base
+from database import Base, engine as app_engine
+from migrations import apply_migrations
+from pagination import PageParams, encode_cursor, keyset
+from Routes import (
+    DashboardRoute,
+    GradingRoute,
+    LessionRoute,
+    LessonCompletedRoute,
+    QuestionandAnswerRoute,
+    QuizletRoute,
+    ScheduleRoute,
+    SubmissionRecordRoute,
+    SubmissionRoute,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the scratch database conftest.py points DATABASE_URL at
+TEST_DB = app_engine.url.database
+
+START, END = date(2025, 1, 1), date(2025, 12, 31)
+
+# "USING PRIMARY KEY" is the clustered index of a WITHOUT ROWID table
+INDEXED = ("USING INDEX", "USING COVERING INDEX", "USING PRIMARY KEY")
+
+# (route, statement, params, tables looked up through a secondary index)
+LOOKUPS = [
+    (
+        "GET /submissions/user/{user_id}",
+        SubmissionRoute.user_submissions_query(1),
+        {},
+        ["submissions"],
+    ),
+    (
+        "POST /exams/{exam_id}/grade",
+        GradingRoute.grading_query(1),
+        {},
+        ["submissions", "submission_record"],
+    ),
+    (
+        "POST /exams/{exam_id}/grade (answer key)",
+        GradingRoute.answer_key_query(1),
+        {},
+        ["questions", "answers"],
+    ),
+    (
+        "GET /submission_record/by_submission/{submission_id}/user/{user_id}",
+        SubmissionRecordRoute.user_records_query(1, 1),
+        {},
+        ["submission_record"],
+    ),
+    (
+        "GET /questions-with-answers/exam/{exam_id}",
+        QuestionandAnswerRoute.exam_questions_query(1),
+        {},
+        ["questions"],
+    ),
+    (
+        "GET /questions-with-answers/exam/{exam_id} (answers)",
+        QuestionandAnswerRoute.question_answers_query([1, 2, 3]),
+        {},
+        ["answers"],
+    ),
+    (
+        "GET /quizlet/by-lesson/{lesson_id}",
+        QuizletRoute.lesson_quizlets_query(1),
+        {},
+        ["quizlet"],
+    ),
+    (
+        "GET /lessons?cursor",
+        keyset(
+            LessionRoute.lesson_rows.select(),
+            PageParams(cursor=encode_cursor([1, 1])),
+            LessionRoute.LESSON_PAGE_KEYS,
+        ),
+        {},
+        ["lessons"],
+    ),
+    (
+        "GET /schedule/by-user/{user_id}?from&to",
+        ScheduleRoute.single_items_query(1, START, END),
+        {},
+        ["schedule"],
+    ),
+    (
+        "GET /schedule/by-user/{user_id}?from&to (recurring)",
+        ScheduleRoute.recurring_items_query(1, START, END),
+        {},
+        ["schedule_recurrence"],
+    ),
+    (
+        "GET /lessons-completed/by-user/{user_id}",
+        LessonCompletedRoute.user_completions_query(1),
+        {},
+        ["lessons_completed"],
+    ),
+    (
+        "GET /users/{user_id}/progress",
+        LessonCompletedRoute.PROGRESS_SQL,
+        {"user_id": 1},
+        ["topic_progress", "lessons"],
+    ),
+    (
+        "GET /users/{user_id}/dashboard",
+        DashboardRoute.DASHBOARD_SQL,
+        {"user_id": 1, "submissions": 5, "upcoming": 5, "today": "2025-01-01"},
+        ["submissions", "topic_progress", "schedule"],
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    with open(f"{ROOT}/progresso_data.sql", encoding="utf-8") as f:
+        seed = sqlite3.connect(TEST_DB)
+        seed.executescript(f.read())
+        seed.close()
+    # the same schema steps as main.init_db, on a synchronous engine
+    engine = create_engine(f"sqlite:///{TEST_DB}")
+    with engine.begin() as sync_conn:
+        Base.metadata.create_all(sync_conn)
+        QuestionandAnswerRoute.Base.metadata.create_all(sync_conn)
+        apply_migrations(sync_conn.exec_driver_sql)
+    engine.dispose()
+    connection = sqlite3.connect(TEST_DB)
+    yield connection
+    connection.close()
+
+
+def query_plan(conn, statement, params) -> list:
+    if isinstance(statement, Select):
+        statement = statement.compile(
+            dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", params)]
+
+
+@pytest.mark.parametrize(
+    "statement, params, tables",
+    [lookup[1:] for lookup in LOOKUPS],
+    ids=[lookup[0] for lookup in LOOKUPS],
+)
+def test_lookup_uses_index(conn, statement, params, tables):
+    plan = query_plan(conn, statement, params)
+    for table in tables:
+        steps = [step for step in plan if re.match(rf"(SEARCH|SCAN) {table}\b", step)]
+        assert steps, f"{table} is not read: {plan}"
+        for step in steps:
+            assert any(using in step for using in INDEXED), plan
@@ -0,0 +1,187 @@
+import asyncio
+import email.utils
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException
+
+# Sustained upstream calls per second and the burst allowed above it
+UPSTREAM_RATE = float(os.getenv("GEMINI_RATE_LIMIT", "10"))
+UPSTREAM_BURST = int(os.getenv("GEMINI_BURST", "20"))
+# Load shedding: reject when this many calls are queued, or after waiting this long
+UPSTREAM_MAX_QUEUE = int(os.getenv("GEMINI_MAX_QUEUE", "200"))
+UPSTREAM_MAX_WAIT = float(os.getenv("GEMINI_MAX_QUEUE_WAIT", "30"))
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "4"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_CAP = float(os.getenv("GEMINI_BACKOFF_CAP", "8"))
+# A Retry-After longer than this is returned to the caller instead of waited out
+UPSTREAM_MAX_RETRY_DELAY = float(os.getenv("GEMINI_MAX_RETRY_DELAY", "20"))
+
+PRIORITIES = {"interactive": 0, "bulk": 1}
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class UpstreamScheduler:
+    """Token-bucket admission with a priority queue and 429-aware retries.
+
+    Callers wait in priority order (interactive before bulk) for a token;
+    the queue is bounded and sheds load with 503. Retryable upstream
+    statuses are retried with jittered exponential backoff, honoring
+    ``Retry-After``; a 429 also pauses admission for everyone.
+    """
+
+    def __init__(
+        self,
+        rate: float = UPSTREAM_RATE,
+        burst: int = UPSTREAM_BURST,
+        max_queue: int = UPSTREAM_MAX_QUEUE,
+        max_wait: float = UPSTREAM_MAX_WAIT,
+        max_attempts: int = UPSTREAM_MAX_ATTEMPTS,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self.paused_until = 0.0
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._waits: deque = deque(maxlen=1000)
+        self.admitted = 0
+        self.shed = 0
+        self.retries = 0
+        self.throttled = 0
+
+    async def aclose(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+    def queue_depth(self) -> int:
+        return sum(1 for entry in self._queue if not entry[2].done())
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))], 4)
+
+        return {
+            "queue_depth": self.queue_depth(),
+            "tokens": round(self.tokens, 2),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "wait_p50_s": pct(0.5) if waits else 0.0,
+            "wait_p95_s": pct(0.95) if waits else 0.0,
+            "wait_max_s": round(waits[-1], 4) if waits else 0.0,
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def _dispatch(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                # the waiter timed out or went away
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+
+    def _busy(self) -> HTTPException:
+        self.shed += 1
+        return HTTPException(
+            status_code=503,
+            detail="AI tutor is busy, please retry shortly.",
+            headers={"Retry-After": str(max(1, round(self.max_wait / 10)))},
+        )
+
+    async def acquire(self, priority: str = "interactive"):
+        level = PRIORITIES.get(priority, 0)
+        # bulk work gets half the queue so interactive chats keep headroom
+        limit = self.max_queue if level == 0 else self.max_queue // 2
+        if self.queue_depth() >= limit:
+            raise self._busy()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (level, next(self._seq), future))
+        self._wakeup.set()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            raise self._busy()
+        self._waits.append(time.monotonic() - start)
+        self.admitted += 1
+
+    def _retry_delay(self, response, attempt: int) -> float:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after
+        ceiling = min(UPSTREAM_BACKOFF_CAP, UPSTREAM_BACKOFF_BASE * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    async def send(self, send: Callable[[], Awaitable], priority: str = "interactive"):
+        """Admit and run ``send()``, retrying retryable upstream statuses.
+
+        ``send`` returns a response-like object with ``status_code``,
+        ``headers`` and ``aclose()``; the last response is returned as-is.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self.acquire(priority)
+            response = await send()
+            if response.status_code not in RETRYABLE_STATUS:
+                return response
+            delay = self._retry_delay(response, attempt)
+            if attempt == self.max_attempts or delay > UPSTREAM_MAX_RETRY_DELAY:
+                return response
+            if response.status_code == 429:
+                self.throttled += 1
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.retries += 1
+            await response.aclose()
+            await asyncio.sleep(delay)